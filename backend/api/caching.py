@@ -0,0 +1,168 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from foodgram.generations import get_generation, get_generations
+
+ANONYMOUS_CACHE_PREFIX = 'anonymous-response'
+
+
+def render_entry(response):
+    content = JSONRenderer().render(response.data)
+    return quote_etag(hashlib.md5(content).hexdigest()), content
+
+
+def entry_response(request, etag, content):
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            content,
+            content_type='application/json',
+        )
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def count_anonymous_cache(outcome):
+    key = f'{ANONYMOUS_CACHE_PREFIX}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def get_anonymous_cache_stats():
+    return {
+        outcome: cache.get(f'{ANONYMOUS_CACHE_PREFIX}:{outcome}', 0)
+        for outcome in ('hits', 'misses')
+    }
+
+
+def reset_anonymous_cache_stats():
+    cache.delete_many([
+        f'{ANONYMOUS_CACHE_PREFIX}:{outcome}'
+        for outcome in ('hits', 'misses')
+    ])
+
+
+class VersionedResponseCacheMixin:
+    cache_generation = None
+    cache_size = 256
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.response_cache = OrderedDict()
+        cls.response_cache_lock = threading.Lock()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs,
+        )
+
+    def get_cache_key(self, request, **kwargs):
+        return (
+            self.action,
+            tuple(sorted(kwargs.items())),
+            tuple(sorted(
+                (name, tuple(values))
+                for name, values in request.query_params.lists()
+            )),
+        )
+
+    def get_cached_entry(self, key, generation):
+        with self.response_cache_lock:
+            entry = self.response_cache.get(key)
+            if entry is None or entry[0] != generation:
+                return None
+            self.response_cache.move_to_end(key)
+            return entry
+
+    def set_cached_entry(self, key, entry):
+        with self.response_cache_lock:
+            self.response_cache[key] = entry
+            self.response_cache.move_to_end(key)
+            while len(self.response_cache) > self.cache_size:
+                self.response_cache.popitem(last=False)
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        generation = get_generation(self.cache_generation)
+        key = self.get_cache_key(request, **kwargs)
+        entry = self.get_cached_entry(key, generation)
+        if entry is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = (generation, *render_entry(response))
+            self.set_cached_entry(key, entry)
+        _, etag, content = entry
+        return entry_response(request, etag, content)
+
+
+class AnonymousResponseCacheMixin:
+    anonymous_cache_generations = ()
+
+    def list(self, request, *args, **kwargs):
+        return self.anonymous_cached_response(
+            super().list, request, *args, **kwargs,
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.anonymous_cached_response(
+            super().retrieve, request, *args, **kwargs,
+        )
+
+    def get_anonymous_cache_key(self, request, **kwargs):
+        params = sorted(
+            (name, tuple(sorted(value for value in values if value)))
+            for name, values in request.query_params.lists()
+        )
+        key = (
+            tuple(sorted(kwargs.items())),
+            tuple((name, values) for name, values in params if values),
+            get_generations(*self.anonymous_cache_generations),
+        )
+        digest = hashlib.md5(repr(key).encode()).hexdigest()
+        return (
+            f'{ANONYMOUS_CACHE_PREFIX}:{self.basename}:{self.action}:'
+            f'{digest}'
+        )
+
+    def anonymous_cached_response(self, handler, request, *args, **kwargs):
+        if (
+            not request.user.is_anonymous
+            or request.accepted_renderer.format != 'json'
+        ):
+            return handler(request, *args, **kwargs)
+        key = self.get_anonymous_cache_key(request, **kwargs)
+        entry = cache.get(key)
+        if entry is None:
+            count_anonymous_cache('misses')
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = render_entry(response)
+            cache.set(key, entry, settings.ANONYMOUS_CACHE_TIMEOUT)
+            outcome = 'MISS'
+        else:
+            count_anonymous_cache('hits')
+            outcome = 'HIT'
+        response = entry_response(request, *entry)
+        response['X-Cache'] = outcome
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
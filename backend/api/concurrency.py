@@ -0,0 +1,40 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from foodgram.metrics import record_queries
+
+
+def async_view(view):
+
+    @wraps(view)
+    def run(request, *args, **kwargs):
+        try:
+            with record_queries():
+                response = view(request, *args, **kwargs)
+                if hasattr(response, 'render') and not response.is_rendered:
+                    response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    async def view_async(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False)(
+            request,
+            *args,
+            **kwargs,
+        )
+
+    return wraps(view)(view_async)
+
+
+class AsyncViewMixin:
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        if settings.ASYNC_VIEWS:
+            return async_view(view)
+        return view
@@ -0,0 +1,28 @@
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from recipes.images import ImageProcessingError, normalize_image
+
+
+class RecipeImageField(Base64ImageField):
+
+    def to_internal_value(self, data):
+        image = super().to_internal_value(data)
+        try:
+            return normalize_image(image)
+        except ImageProcessingError as error:
+            raise serializers.ValidationError(str(error))
+
+
+class ImageVariantField(serializers.ImageField):
+
+    def __init__(self, fallback='image', **kwargs):
+        self.fallback = fallback
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return (
+            super().get_attribute(instance)
+            or getattr(instance, self.fallback)
+        )
@@ -22,6 +22,7 @@ class RecipeFilter(FilterSet):
         queryset=Tag.objects.all(),
     )
 
+    search = filters.CharFilter(method='search_filter')
     is_favorited = filters.BooleanFilter(method='is_favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(
         method='is_in_shopping_cart_filter')
@@ -33,6 +34,11 @@ class RecipeFilter(FilterSet):
             'author',
         )
 
+    def search_filter(self, queryset, name, value):
+        if value.strip():
+            return queryset.search(value)
+        return queryset
+
     def is_favorited_filter(self, queryset, name, value):
         user = self.request.user
         if not user.is_anonymous and value:
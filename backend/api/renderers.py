@@ -0,0 +1,74 @@
+import csv
+import io
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class ShoppingCartRendererMixin(ABC):
+    charset = 'utf-8'
+
+    @abstractmethod
+    def stream(self, ingredients):
+        pass
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data).encode(self.charset)
+
+
+class ShoppingCartTextRenderer(ShoppingCartRendererMixin, BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Ваш список покупок\n' + '-------------------\n\n'
+        separator = ''
+        for ingredient in ingredients:
+            yield (
+                f'{separator}{ingredient["name"]} - '
+                f'{ingredient["total_amount"]} '
+                f'{ingredient["measurement_unit"]}'
+            )
+            separator = '\n'
+        yield '\n-------------------\n' + 'Составлено в foodgram'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRendererMixin, BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('name', 'measurement_unit', 'amount'))
+        for ingredient in ingredients:
+            writer.writerow((
+                ingredient['name'],
+                ingredient['measurement_unit'],
+                ingredient['total_amount'],
+            ))
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRendererMixin, JSONRenderer):
+    render = JSONRenderer.render
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['name'],
+                    'measurement_unit': ingredient['measurement_unit'],
+                    'amount': ingredient['total_amount'],
+                },
+                ensure_ascii=False,
+            )
+            separator = ','
+        yield ']' if separator == ',' else '[]'
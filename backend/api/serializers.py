@@ -1,23 +1,28 @@
 from django.conf import settings as s
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 from rest_framework.relations import PrimaryKeyRelatedField
 from rest_framework.serializers import ModelSerializer
 
+from foodgram.metrics import SerializerMetricsMixin
+from recipes.images import schedule_image_variants
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.user_state import get_user_ids
 from recipes.models import (
     Ingredient,
     Recipe,
     RecipeIngredient,
     Tag,
-    Favorite,
-    ShoppingCart,
+    ShoppingCartIngredient,
 )
 from users.serializers import CustomUserSerializer
+from .fields import ImageVariantField, RecipeImageField
 
 
-class IngredientSerializer(ModelSerializer):
+class IngredientSerializer(SerializerMetricsMixin, ModelSerializer):
     class Meta:
         model = Ingredient
         fields = (
@@ -27,7 +32,41 @@ class IngredientSerializer(ModelSerializer):
         )
 
 
-class TagSerializer(ModelSerializer):
+class IngredientSearchSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    limit = serializers.IntegerField(
+        min_value=1,
+        default=s.INGREDIENT_SEARCH_LIMIT,
+    )
+
+
+class RecipeCookSerializer(serializers.Serializer):
+    ingredients = serializers.CharField()
+    max_missing = serializers.IntegerField(min_value=0, required=False)
+    rank = serializers.ChoiceField(
+        choices=('missing', 'coverage'),
+        default='missing',
+    )
+
+    def validate_ingredients(self, value):
+        try:
+            ingredient_ids = {
+                int(ingredient_id)
+                for ingredient_id in value.split(',')
+                if ingredient_id.strip()
+            }
+        except ValueError:
+            raise serializers.ValidationError(
+                'Укажите id ингредиентов через запятую'
+            )
+        if not ingredient_ids:
+            raise serializers.ValidationError(
+                'Нужно указать хотя бы один ингредиент'
+            )
+        return ingredient_ids
+
+
+class TagSerializer(SerializerMetricsMixin, ModelSerializer):
     class Meta:
         model = Tag
         fields = (
@@ -78,7 +117,7 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(SerializerMetricsMixin, ModelSerializer):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientReadSerializer(
@@ -86,6 +125,7 @@ class RecipeReadSerializer(ModelSerializer):
         many=True,
     )
     image = Base64ImageField()
+    image_card = ImageVariantField()
     is_favorited = SerializerMethodField(
         method_name='get_is_favorited'
     )
@@ -93,20 +133,16 @@ class RecipeReadSerializer(ModelSerializer):
         method_name='get_is_in_shopping_cart'
     )
 
-    def is_user_is_owner(self, request, obj, model):
-        user = request.user
-        return (
-            user.is_authenticated
-            and model.objects.filter(user=user, recipe=obj, ).exists()
-        )
+    def is_user_is_owner(self, request, obj, relation):
+        return obj.pk in get_user_ids(request, relation)
 
     def get_is_favorited(self, obj):
         request = self.context.get('request')
-        return self.is_user_is_owner(request, obj, Favorite)
+        return self.is_user_is_owner(request, obj, 'favorites')
 
     def get_is_in_shopping_cart(self, obj):
         request = self.context.get('request')
-        return self.is_user_is_owner(request, obj, ShoppingCart)
+        return self.is_user_is_owner(request, obj, 'shopping_cart')
 
     class Meta:
         model = Recipe
@@ -119,6 +155,7 @@ class RecipeReadSerializer(ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_card',
             'text',
             'cooking_time',
         )
@@ -131,7 +168,7 @@ class RecipeWriteSerializer(ModelSerializer):
     )
     author = CustomUserSerializer(read_only=True)
     ingredients = RecipeIngredientWriteSerializer(many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     cooking_time = serializers.IntegerField(
         validators=(
             MinValueValidator(
@@ -162,29 +199,81 @@ class RecipeWriteSerializer(ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_amount(recipe, ingredients)
+        recipe_ingredient_index.schedule_refresh(recipe.pk)
+        schedule_image_variants(recipe)
         return recipe
 
+    def update_ingredients(self, instance, ingredients):
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in instance.recipeingredient_set.all()
+        }
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        deltas = {}
+        changed = []
+        for ingredient_id, recipe_ingredient in current.items():
+            amount = amounts.get(ingredient_id, 0)
+            deltas[ingredient_id] = amount - recipe_ingredient.amount
+            if amount and deltas[ingredient_id]:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        removed = [
+            ingredient_id
+            for ingredient_id in current
+            if ingredient_id not in amounts
+        ]
+        added = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in current
+        ]
+        for ingredient in added:
+            deltas[ingredient['id']] = ingredient['amount']
+        if removed:
+            instance.recipeingredient_set.filter(
+                ingredient_id__in=removed,
+            ).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if added:
+            self.create_amount(instance, added)
+        if removed or added:
+            recipe_ingredient_index.schedule_refresh(instance.pk)
+        ShoppingCartIngredient.objects.apply_recipe_deltas(
+            instance.pk,
+            deltas,
+        )
+
+    @transaction.atomic
     def update(self, instance, validated_data):
         tags = validated_data.pop('tags', None)
         if tags:
             instance.tags.set(tags)
         ingredients = validated_data.pop('ingredients', None)
         if ingredients:
-            instance.ingredients.clear()
-            self.create_amount(instance, ingredients)
+            self.update_ingredients(instance, ingredients)
+        if 'image' in validated_data:
+            instance.image_card = ''
+            instance.image_thumbnail = ''
+            schedule_image_variants(instance)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_related().get(pk=instance.pk)
         serializer = RecipeReadSerializer(
             instance,
             context={
-                'request': self.context.get('request')
+                'request': request
             }
         )
         return serializer.data
 
     def validate(self, data):
-        ingredients = data.get('ingredients')
+        ingredients = data.get('ingredients', ())
 
         id_list = [ingredient['id'] for ingredient in ingredients]
         if len(set(id_list)) != len(id_list):
@@ -208,12 +297,28 @@ class RecipeWriteSerializer(ModelSerializer):
         )
 
 
-class RecipeCardSerializer(serializers.ModelSerializer):
+class RecipeCardSerializer(
+    SerializerMetricsMixin,
+    serializers.ModelSerializer,
+):
+    image_card = ImageVariantField()
+    image_thumbnail = ImageVariantField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_card',
+            'image_thumbnail',
             'cooking_time',
         )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=s.BULK_RECIPES_LIMIT,
+    )
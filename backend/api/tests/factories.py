@@ -0,0 +1,36 @@
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+
+def create_user(username='user', superuser=False):
+    create = (
+        User.objects.create_superuser if superuser
+        else User.objects.create_user
+    )
+    return create(
+        email=f'{username}@example.com',
+        username=username,
+        first_name='Имя',
+        last_name='Фамилия',
+        password='password',
+    )
+
+
+def create_recipe(author, name='Рецепт'):
+    return Recipe.objects.create(
+        author=author,
+        name=name,
+        text='Описание',
+        cooking_time=10,
+        image='recipe_img/recipe.png',
+    )
+
+
+def create_ingredients(count):
+    return [
+        Ingredient.objects.create(
+            name=f'Ингредиент {number}',
+            measurement_unit='г',
+        )
+        for number in range(count)
+    ]
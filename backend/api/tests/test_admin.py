@@ -0,0 +1,102 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import (RecipeIngredient, ShoppingCart,
+                            ShoppingCartIngredient)
+from .factories import create_ingredients, create_recipe, create_user
+
+
+class ShoppingCartAdminTotalsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = create_user('admin', superuser=True)
+        cls.user = create_user()
+        cls.ingredients = create_ingredients(2)
+        cls.recipes = [
+            create_recipe(cls.admin, f'Рецепт {number}')
+            for number in range(2)
+        ]
+        for recipe in cls.recipes:
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredient=cls.ingredients[0],
+                amount=10,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def assert_totals(self, expected):
+        call_command('rebuild_shopping_cart', '--check', stdout=io.StringIO())
+        self.assertEqual(
+            dict(
+                ShoppingCartIngredient.objects.filter(
+                    user=self.user,
+                ).values_list('ingredient_id', 'total_amount')
+            ),
+            expected,
+        )
+
+    def add_to_cart(self, recipe):
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        ShoppingCartIngredient.objects.add_recipes(
+            (self.user.pk,),
+            (recipe.pk,),
+        )
+
+    def post(self, url, data):
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+
+    def test_shopping_cart_admin(self):
+        first, second = self.recipes
+        ingredient = self.ingredients[0]
+        self.post(
+            '/admin/recipes/shoppingcart/add/',
+            {'user': self.user.pk, 'recipe': first.pk},
+        )
+        self.assert_totals({ingredient.pk: 10})
+        cart = ShoppingCart.objects.get(user=self.user)
+        self.post(
+            f'/admin/recipes/shoppingcart/{cart.pk}/change/',
+            {'user': self.admin.pk, 'recipe': first.pk},
+        )
+        self.assert_totals({})
+        self.add_to_cart(first)
+        self.add_to_cart(second)
+        self.assert_totals({ingredient.pk: 20})
+        self.post(
+            '/admin/recipes/shoppingcart/',
+            {
+                'action': 'delete_selected',
+                'post': 'yes',
+                '_selected_action': list(
+                    ShoppingCart.objects.values_list('pk', flat=True)
+                ),
+            },
+        )
+        self.assert_totals({})
+
+    def test_recipe_ingredient_admin(self):
+        recipe = self.recipes[0]
+        first, second = self.ingredients
+        self.add_to_cart(recipe)
+        recipe_ingredient = RecipeIngredient.objects.get(recipe=recipe)
+        self.post(
+            f'/admin/recipes/recipeingredient/{recipe_ingredient.pk}/change/',
+            {'recipe': recipe.pk, 'ingredient': first.pk, 'amount': 25},
+        )
+        self.assert_totals({first.pk: 25})
+        self.post(
+            '/admin/recipes/recipeingredient/add/',
+            {'recipe': recipe.pk, 'ingredient': second.pk, 'amount': 5},
+        )
+        self.assert_totals({first.pk: 25, second.pk: 5})
+        self.post(
+            f'/admin/recipes/recipeingredient/{recipe_ingredient.pk}/delete/',
+            {'post': 'yes'},
+        )
+        self.assert_totals({second.pk: 5})
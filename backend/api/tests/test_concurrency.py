@@ -0,0 +1,95 @@
+import io
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, skipUnlessDBFeature
+from rest_framework.test import APIClient
+
+from recipes.models import RecipeIngredient
+from .factories import create_ingredients, create_recipe, create_user
+
+
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentToggleTest(TransactionTestCase):
+    WORKERS = 8
+
+    def setUp(self):
+        self.user = create_user()
+        ingredients = create_ingredients(3)
+        self.recipes = []
+        for number in range(3):
+            recipe = create_recipe(self.user, f'Рецепт {number}')
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=10 + number,
+                )
+                for ingredient in ingredients[:number + 1]
+            )
+            self.recipes.append(recipe)
+
+    def run_concurrently(self, method, url, data=None):
+        barrier = threading.Barrier(self.WORKERS)
+
+        def send(_):
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                return getattr(client, method)(url, data, format='json')
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.WORKERS) as executor:
+            return list(executor.map(send, range(self.WORKERS)))
+
+    def assert_totals_in_sync(self):
+        call_command('rebuild_shopping_cart', '--check', stdout=io.StringIO())
+
+    def test_bulk_shopping_cart(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        for method, changed, unchanged in (
+            ('post', 'added', 'exists'),
+            ('delete', 'removed', 'absent'),
+        ):
+            with self.subTest(method=method):
+                responses = self.run_concurrently(
+                    method,
+                    '/api/recipes/shopping_cart/bulk/',
+                    {'ids': recipe_ids},
+                )
+                self.assertEqual(
+                    {response.status_code for response in responses},
+                    {200},
+                )
+                statuses = Counter(
+                    (result['id'], result['status'])
+                    for response in responses
+                    for result in response.json()['results']
+                )
+                for recipe_id in recipe_ids:
+                    self.assertEqual(statuses[recipe_id, changed], 1)
+                    self.assertEqual(
+                        statuses[recipe_id, unchanged],
+                        self.WORKERS - 1,
+                    )
+                self.assert_totals_in_sync()
+
+    def test_single_toggle(self):
+        recipe = self.recipes[2]
+        for relation in ('favorite', 'shopping_cart'):
+            url = f'/api/recipes/{recipe.id}/{relation}/'
+            for method, changed_status in (('post', 201), ('delete', 204)):
+                with self.subTest(relation=relation, method=method):
+                    responses = self.run_concurrently(method, url)
+                    self.assertEqual(
+                        Counter(
+                            response.status_code for response in responses
+                        ),
+                        {changed_status: 1, 400: self.WORKERS - 1},
+                    )
+                    self.assert_totals_in_sync()
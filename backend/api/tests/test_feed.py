@@ -0,0 +1,48 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import FeedEntry
+from users.models import Subscribe
+from .factories import create_recipe, create_user
+
+
+@override_settings(FEED_BACKFILL_LIMIT=2, FEED_FANOUT_LIMIT=1)
+class FeedBackfillTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [create_user(f'user{number}') for number in range(4)]
+        cls.recipes = {
+            author: [
+                create_recipe(author, f'Рецепт {number}')
+                for number in range(3)
+            ]
+            for author in cls.users[2:]
+        }
+
+    def test_backfill_all(self):
+        first, second, push_author, pull_author = self.users
+        Subscribe.objects.bulk_create(
+            Subscribe(user=user, author=author)
+            for user, author in (
+                (first, push_author),
+                (first, pull_author),
+                (second, pull_author),
+            )
+        )
+        with CaptureQueriesContext(connection) as queries:
+            written = FeedEntry.objects.backfill_all()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(written, 2)
+        self.assertEqual(
+            set(FeedEntry.objects.values_list('user', 'recipe')),
+            {
+                (first.pk, recipe.pk)
+                for recipe in self.recipes[push_author][-2:]
+            },
+        )
+        self.assertEqual(
+            FeedEntry.objects.backfill_all(first_user_id=second.pk),
+            0,
+        )
@@ -0,0 +1,41 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from foodgram.generations import get_generation, get_timeout
+from recipes.models import Ingredient, Tag
+
+
+class GenerationBumpTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bumped_after_commit(self):
+        for name, create in (
+            ('tags', lambda: Tag.objects.create(
+                name='Завтрак',
+                color='#E26C2D',
+                slug='breakfast',
+            )),
+            ('ingredients', lambda: Ingredient.objects.create(
+                name='Соль',
+                measurement_unit='г',
+            )),
+        ):
+            with self.subTest(name=name):
+                generation = get_generation(name)
+                with self.captureOnCommitCallbacks(execute=True):
+                    create()
+                    self.assertEqual(get_generation(name), generation)
+                self.assertNotEqual(get_generation(name), generation)
+
+    @override_settings(GENERATION_LOCAL_TIMEOUT=30)
+    def test_timeouts(self):
+        self.assertEqual(get_timeout(), 30)
+        self.assertEqual(get_timeout(60), 30)
+        self.assertEqual(get_timeout(10), 10)
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django_redis.cache.RedisCache'},
+        }):
+            self.assertIsNone(get_timeout())
+            self.assertEqual(get_timeout(60), 60)
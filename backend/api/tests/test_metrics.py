@@ -0,0 +1,34 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .factories import create_recipe, create_user
+
+
+@override_settings(QUERY_BUDGET=0, QUERY_BUDGET_LOG_TEMPLATES=1)
+class QueryBudgetLogTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.recipe = create_recipe(cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_warning_lists_only_top_templates(self):
+        with self.assertLogs('foodgram.metrics', 'WARNING') as logs:
+            self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(len(logs.records), 1)
+        message = logs.records[0].getMessage()
+        self.assertIn('budget is 0', message)
+        self.assertEqual(len(message.split('\n')), 2)
+
+    def test_debug_logs_all_queries(self):
+        with self.assertLogs('foodgram.metrics', 'DEBUG') as logs:
+            self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(
+            [record.levelname for record in logs.records],
+            ['WARNING', 'DEBUG'],
+        )
+        self.assertGreater(len(logs.records[1].getMessage().split('\n')), 2)
@@ -0,0 +1,101 @@
+import base64
+import json
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from foodgram.pagination import CachedCountPaginator
+from recipes.models import Recipe
+from users.models import Subscribe
+from .factories import create_recipe, create_user
+
+
+def encode(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class KeysetPaginationTest(TestCase):
+    MALFORMED_CURSORS = (
+        'not base64!',
+        base64.urlsafe_b64encode(b'not json').decode(),
+        encode([True, 5]),
+        encode([False, ['notadate', 3]]),
+        encode([False, ['2023-01-01 00:00:00', 'three']]),
+        encode([False, ['2023-01-01 00:00:00']]),
+        encode([False, [None, 3]]),
+        encode([1, ['2023-01-01 00:00:00', 3]]),
+        encode({'reverse': False}),
+        encode([False, [[], {}]]),
+        encode('cursor'),
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.author = create_user('author')
+        Subscribe.objects.create(user=cls.user, author=cls.author)
+        for number in range(5):
+            create_recipe(cls.author, f'Рецепт {number}')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_walks_all_pages(self):
+        url = '/api/recipes/?pagination=cursor&limit=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(recipe['id'] for recipe in response.json()['results'])
+            url = response.json()['next']
+        self.assertEqual(
+            seen,
+            list(
+                Recipe.objects.order_by(
+                    '-pub_date',
+                    '-id',
+                ).values_list('id', flat=True)
+            ),
+        )
+
+    def test_malformed_cursor_returns_not_found(self):
+        for url in (
+            '/api/recipes/',
+            '/api/recipes/feed/',
+            '/api/users/subscriptions/',
+        ):
+            for cursor in self.MALFORMED_CURSORS:
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(
+                        url,
+                        {'pagination': 'cursor', 'cursor': cursor},
+                    )
+                    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PAGINATION_COUNT_ESTIMATE_THRESHOLD=1)
+class ApproximateCountPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        for number in range(5):
+            create_recipe(author, f'Рецепт {number}')
+
+    @mock.patch.object(CachedCountPaginator, 'estimate_count', return_value=1)
+    def test_low_estimate_does_not_hide_pages(self, estimate_count):
+        client = APIClient()
+        response = client.get('/api/recipes/', {'limit': 2, 'page': 2})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['count'], 1)
+        self.assertTrue(data['count_approximate'])
+        self.assertEqual(len(data['results']), 2)
+        self.assertIsNotNone(data['next'])
+        response = client.get('/api/recipes/', {'limit': 2, 'page': 3})
+        self.assertEqual(len(response.json()['results']), 1)
+        self.assertIsNone(response.json()['next'])
+        response = client.get('/api/recipes/', {'limit': 2, 'page': 4})
+        self.assertEqual(response.status_code, 404)
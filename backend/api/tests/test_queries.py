@@ -0,0 +1,72 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, RecipeIngredient, ShoppingCart, Tag
+from users.models import Subscribe
+from .factories import create_ingredients, create_recipe, create_user
+
+NO_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
+}
+
+
+@override_settings(CACHES=NO_CACHE)
+class RecipeListQueriesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        authors = [create_user(f'author{number}') for number in range(4)]
+        tags = [
+            Tag.objects.create(
+                name=f'Тег {number}',
+                color=f'#00000{number}',
+                slug=f'tag{number}',
+            )
+            for number in range(3)
+        ]
+        ingredients = create_ingredients(5)
+        for number in range(25):
+            recipe = create_recipe(
+                authors[number % len(authors)],
+                f'Рецепт {number}',
+            )
+            recipe.tags.set(tags[:1 + number % len(tags)])
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredient,
+                    amount=10,
+                )
+                for ingredient in ingredients[:1 + number % len(ingredients)]
+            )
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        for author in authors[:2]:
+            Subscribe.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.guest_client = APIClient()
+        self.authorized_client = APIClient()
+        self.authorized_client.force_authenticate(self.user)
+
+    def count_queries(self, client, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for client in (self.guest_client, self.authorized_client):
+            with self.subTest(authorized=client is self.authorized_client):
+                self.assertEqual(
+                    self.count_queries(client, 2),
+                    self.count_queries(client, 20),
+                )
@@ -0,0 +1,24 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, ShoppingCart
+from .factories import create_recipe, create_user
+
+
+class AnonymousToggleTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.recipe = create_recipe(create_user('author'))
+
+    def test_anonymous_toggle_is_unauthorized(self):
+        client = APIClient()
+        for relation in ('favorite', 'shopping_cart'):
+            for method in ('post', 'delete'):
+                with self.subTest(relation=relation, method=method):
+                    response = getattr(client, method)(
+                        f'/api/recipes/{self.recipe.id}/{relation}/'
+                    )
+                    self.assertEqual(response.status_code, 401)
+        self.assertFalse(Favorite.objects.exists())
+        self.assertFalse(ShoppingCart.objects.exists())
@@ -0,0 +1,78 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes import user_state
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscribe
+from .factories import create_recipe, create_user
+
+
+class UserStateCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user()
+        cls.author = create_user('author')
+        cls.recipe = create_recipe(cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_flags(self):
+        recipe = self.client.get(f'/api/recipes/{self.recipe.id}/').data
+        return (
+            recipe['is_favorited'],
+            recipe['is_in_shopping_cart'],
+            recipe['author']['is_subscribed'],
+        )
+
+    def test_orm_writes_invalidate_cached_ids(self):
+        self.assertEqual(self.get_flags(), (False, False, False))
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+            Subscribe.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.get_flags(), (True, True, True))
+        with self.captureOnCommitCallbacks(execute=True):
+            Subscribe.objects.filter(user=self.user).delete()
+        self.assertEqual(self.get_flags(), (True, True, False))
+        self.assertEqual(
+            user_state.load_ids('favorites', self.user.pk),
+            {self.recipe.pk},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.recipe.delete()
+        self.assertEqual(
+            user_state.load_ids('favorites', self.user.pk),
+            set(),
+        )
+        self.assertEqual(
+            user_state.load_ids('shopping_cart', self.user.pk),
+            set(),
+        )
+
+    def test_snapshot_loaded_before_commit_is_not_served(self):
+        test = self
+
+        class CommitBeforeSet:
+            get = staticmethod(cache.get)
+
+            def set(self, *args, **kwargs):
+                with test.captureOnCommitCallbacks(execute=True):
+                    Favorite.objects.create(user=test.user, recipe=test.recipe)
+                cache.set(*args, **kwargs)
+
+        with mock.patch.object(user_state, 'cache', CommitBeforeSet()):
+            self.assertEqual(
+                user_state.load_ids('favorites', self.user.pk),
+                set(),
+            )
+        self.assertEqual(
+            user_state.load_ids('favorites', self.user.pk),
+            {self.recipe.pk},
+        )
@@ -1,6 +1,12 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
@@ -8,17 +14,30 @@ from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
-from foodgram.pagination import CustomPagination
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from foodgram.pagination import KeysetPagination, OptionalKeysetPagination
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from recipes.recipe_index import recipe_ingredient_index
+from recipes.user_state import get_relation, invalidate_user_ids
+from .caching import AnonymousResponseCacheMixin, VersionedResponseCacheMixin
+from .concurrency import AsyncViewMixin
 from .filters import IngredientFilter, RecipeFilter
 from .permissions import IsAdminOrReadOnly, IsAuthorOrAdminOrReadOnly
-from .serializers import (IngredientSerializer, RecipeCardSerializer,
-                          RecipeReadSerializer, RecipeWriteSerializer,
-                          TagSerializer)
+from .renderers import (ShoppingCartCSVRenderer, ShoppingCartJSONRenderer,
+                        ShoppingCartTextRenderer)
+from .serializers import (IngredientSearchSerializer, IngredientSerializer,
+                          RecipeCardSerializer, RecipeCookSerializer,
+                          RecipeIdsSerializer, RecipeReadSerializer,
+                          RecipeWriteSerializer, TagSerializer)
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(
+    AsyncViewMixin,
+    VersionedResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
+    cache_generation = 'ingredients'
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
@@ -26,21 +45,56 @@ class IngredientViewSet(ReadOnlyModelViewSet):
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if not request.query_params.get('name'):
+            return super().list(request, *args, **kwargs)
+        return self.cached_response(self.search, request, *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            ingredient_index.search(
+                serializer.validated_data['name'],
+                serializer.validated_data['limit'],
+            )
+        )
+
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(
+    AsyncViewMixin,
+    VersionedResponseCacheMixin,
+    ReadOnlyModelViewSet,
+):
+    cache_generation = 'tags'
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
 
-class RecipeViewSet(ModelViewSet):
+class RecipeViewSet(
+    AsyncViewMixin,
+    AnonymousResponseCacheMixin,
+    ModelViewSet,
+):
+    anonymous_cache_generations = ('recipes', 'ingredients', 'tags', 'users')
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = OptionalKeysetPagination
+    lookup_value_regex = r'\d+'
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    @property
+    def keyset_ordering(self):
+        if self.action == 'cook':
+            return None
+        return ('-pub_date', '-id')
+
+    def get_queryset(self):
+        return Recipe.objects.with_related()
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -50,31 +104,88 @@ class RecipeViewSet(ModelViewSet):
         return RecipeWriteSerializer
 
     def post_delete_recipe(self, request, pk, model):
-        recipe = get_object_or_404(Recipe, pk=pk)
         user = request.user
-        if request.method == 'DELETE':
-            if model.objects.filter(
-                    user=request.user,
-                    recipe__id=pk,
-            ).exists():
-                model.objects.filter(user=user, recipe=recipe).delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-
-        if model.objects.filter(
-                user=request.user,
-                recipe__id=pk,
-        ).exists():
+        recipe_id = int(pk)
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                changed = model.objects.remove(user, recipe_id)
+                if changed:
+                    invalidate_user_ids(user.pk, get_relation(model))
+                if changed and model is ShoppingCart:
+                    ShoppingCartIngredient.objects.remove_recipes(
+                        (user.pk,),
+                        (recipe_id,),
+                    )
+            else:
+                changed = model.objects.add(user, recipe_id)
+                if changed:
+                    invalidate_user_ids(user.pk, get_relation(model))
+                if changed and model is ShoppingCart:
+                    ShoppingCartIngredient.objects.add_recipes(
+                        (user.pk,),
+                        (recipe_id,),
+                    )
+        if not changed:
+            get_object_or_404(Recipe, pk=recipe_id)
+            if request.method == 'DELETE':
+                error = 'Нельзя удалить рецепт, он не был добавлен'
+            else:
+                error = 'Нельзя добавить рецепт, он уже добавлен'
             return Response(
-                {'errors': 'Нельзя добавить рецепт, он уже добавлен'},
+                {'errors': error},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        model.objects.create(user=user, recipe=recipe)
+        if request.method == 'DELETE':
+            return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = RecipeCardSerializer(
-            recipe,
+            get_object_or_404(Recipe, pk=recipe_id),
             context={'request': request}
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def bulk_post_delete_recipes(self, request, model):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = list(dict.fromkeys(serializer.validated_data['ids']))
+        user = request.user
+        found_ids = set(
+            Recipe.objects.filter(
+                id__in=recipe_ids,
+            ).values_list('id', flat=True)
+        )
+        with transaction.atomic():
+            if request.method == 'DELETE':
+                changed_ids = model.objects.remove_many(user, recipe_ids)
+                if changed_ids:
+                    invalidate_user_ids(user.pk, get_relation(model))
+                if changed_ids and model is ShoppingCart:
+                    ShoppingCartIngredient.objects.remove_recipes(
+                        (user.pk,),
+                        changed_ids,
+                    )
+                changed_status, unchanged_status = 'removed', 'absent'
+            else:
+                changed_ids = model.objects.add_many(user, recipe_ids)
+                if changed_ids:
+                    invalidate_user_ids(user.pk, get_relation(model))
+                if changed_ids and model is ShoppingCart:
+                    ShoppingCartIngredient.objects.add_recipes(
+                        (user.pk,),
+                        changed_ids,
+                    )
+                changed_status, unchanged_status = 'added', 'exists'
+        changed_ids = set(changed_ids)
+        results = []
+        for recipe_id in recipe_ids:
+            if recipe_id in changed_ids:
+                result = changed_status
+            elif recipe_id not in found_ids:
+                result = 'not_found'
+            else:
+                result = unchanged_status
+            results.append({'id': recipe_id, 'status': result})
+        return Response({'results': results})
+
     @action(
         detail=True,
         url_path='favorite',
@@ -88,41 +199,127 @@ class RecipeViewSet(ModelViewSet):
         detail=True,
         url_path='shopping_cart',
         methods=('POST', 'DELETE'),
+        permission_classes=(IsAuthenticated,)
     )
     def shopping_cart(self, request, pk):
         return self.post_delete_recipe(request, pk, ShoppingCart)
 
     @action(
         detail=False,
-        url_path='download_shopping_cart',
+        url_path='favorite/bulk',
+        methods=('POST', 'DELETE'),
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return self.bulk_post_delete_recipes(request, Favorite)
+
+    @action(
+        detail=False,
+        url_path='shopping_cart/bulk',
+        methods=('POST', 'DELETE'),
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return self.bulk_post_delete_recipes(request, ShoppingCart)
+
+    @action(
+        detail=False,
+        url_path='cook',
+        methods=('GET',),
+    )
+    def cook(self, request):
+        serializer = RecipeCookSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        found = recipe_ingredient_index.search(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data.get('max_missing'),
+            serializer.validated_data['rank'],
+        )
+        page = self.paginate_queryset(found)
+        recipes = self.get_queryset().in_bulk(
+            [entry['id'] for entry in page]
+        )
+        page = [entry for entry in page if entry['id'] in recipes]
+        data = self.get_serializer(
+            [recipes[entry['id']] for entry in page],
+            many=True,
+        ).data
+        for recipe, entry in zip(data, page):
+            recipe.update(entry)
+        return self.get_paginated_response(data)
+
+    @action(
+        detail=False,
+        url_path='feed',
         methods=('GET',),
         permission_classes=(IsAuthenticated,)
     )
+    def feed(self, request):
+        paginator = KeysetPagination(('-pub_date', '-recipe_id'))
+        page = paginator.paginate_querysets(
+            FeedEntry.objects.timeline_sources(request.user),
+            request,
+            self,
+        )
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in page]
+        )
+        serializer = self.get_serializer(
+            [
+                recipes[entry.recipe_id]
+                for entry in page
+                if entry.recipe_id in recipes
+            ],
+            many=True,
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        url_path='download_shopping_cart',
+        methods=('GET',),
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer,
+        ),
+    )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shopping_cart__user=user
+        renderer = request.accepted_renderer
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user,
         ).values(
-            "ingredient__name",
-            "ingredient__measurement_unit"
-        ).annotate(total_amount=Sum("amount"))
-        list_of_ingredients = []
-        for ingredient in ingredients:
-            list_of_ingredients.append(
-                (
-                    f'{ingredient["ingredient__name"]} - '
-                    f'{ingredient["total_amount"]} '
-                    f'{ingredient["ingredient__measurement_unit"]}'
-                )
+            'total_amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit'),
+        ).order_by('name')
+        buffer_limit = settings.SHOPPING_CART_BUFFER_LIMIT
+        buffered = list(ingredients[:buffer_limit + 1])
+        if len(buffered) <= buffer_limit:
+            content = ''.join(renderer.stream(buffered)).encode(
+                renderer.charset,
             )
-
-        header = 'Ваш список покупок\n' + '-------------------\n'
-        footer = '-------------------\n' + 'Составлено в foodgram'
-        response = HttpResponse(
-            header + '\n' + '\n'.join(list_of_ingredients) + '\n' + footer,
-            content_type='text/plain',
+            etag = quote_etag(hashlib.md5(content).hexdigest())
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = HttpResponse(content)
+                response['Content-Length'] = len(content)
+            response['ETag'] = etag
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            if settings.ASYNC_VIEWS:
+                rows = list(ingredients)
+            else:
+                rows = ingredients.iterator()
+            response = StreamingHttpResponse(
+                chunk.encode(renderer.charset)
+                for chunk in renderer.stream(rows)
+            )
+        response['Content-Type'] = (
+            f'{renderer.media_type}; charset={renderer.charset}'
         )
         response['Content-Disposition'] = (
-            'attachment; filename=Shopping_Cart.txt'
+            f'attachment; filename=Shopping_Cart.{renderer.format}'
         )
         return response
@@ -0,0 +1,71 @@
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+KEY_PREFIX = 'generation'
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def initial_generation():
+    return time.time_ns()
+
+
+def is_local_cache():
+    return settings.CACHES['default']['BACKEND'] in LOCAL_CACHE_BACKENDS
+
+
+def get_timeout(timeout=None):
+    if is_local_cache():
+        if timeout is None:
+            return settings.GENERATION_LOCAL_TIMEOUT
+        return min(timeout, settings.GENERATION_LOCAL_TIMEOUT)
+    return timeout
+
+
+def get_generation(name, timeout=None):
+    return cache.get_or_set(
+        f'{KEY_PREFIX}:{name}',
+        initial_generation,
+        timeout=get_timeout(timeout),
+    )
+
+
+def get_generations(*names):
+    keys = [f'{KEY_PREFIX}:{name}' for name in names]
+    found = cache.get_many(keys)
+    return tuple(
+        found[key] if key in found else get_generation(name)
+        for name, key in zip(names, keys)
+    )
+
+
+def bump_generation(name, timeout=None):
+    key = f'{KEY_PREFIX}:{name}'
+    try:
+        return cache.incr(key)
+    except ValueError:
+        generation = initial_generation()
+        cache.set(key, generation, timeout=get_timeout(timeout))
+        return generation
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if is_local_cache() and settings.WEB_CONCURRENCY > 1:
+        return [
+            checks.Error(
+                'Generation counters are kept in a per-process cache, so '
+                'the workers do not see each other\'s invalidations.',
+                hint=(
+                    'Set CACHE_BACKEND and CACHE_LOCATION to a shared cache '
+                    '(Redis, Memcached) or run a single worker '
+                    '(WEB_CONCURRENCY=1).'
+                ),
+                id='foodgram.E001',
+            ),
+        ]
+    return []
@@ -0,0 +1,229 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+current_request = ContextVar('current_request_metrics', default=None)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets))
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        labels = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [
+                    [0] * (len(self.buckets) + 1),
+                    0,
+                ]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def format_labels(self, labels, **extra):
+        pairs = [*labels, *extra.items()]
+        if not pairs:
+            return ''
+        return '{' + ','.join(
+            '{}="{}"'.format(
+                name,
+                str(value).replace('\\', '\\\\').replace('"', '\\"'),
+            )
+            for name, value in pairs
+        ) + '}'
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = sorted(
+                (labels, list(counts), total)
+                for labels, (counts, total) in self.series.items()
+            )
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket'
+                    f'{self.format_labels(labels, le=bound)} {cumulative}'
+                )
+            lines.append(
+                f'{self.name}_sum{self.format_labels(labels)} {total}'
+            )
+            lines.append(
+                f'{self.name}_count{self.format_labels(labels)} {cumulative}'
+            )
+        return '\n'.join(lines)
+
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5,
+)
+
+REQUEST_DURATION = Histogram(
+    'foodgram_request_duration_seconds',
+    'Time spent handling the request.',
+    SECONDS_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    'foodgram_request_queries',
+    'Number of SQL queries per request.',
+    (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_DB_DURATION = Histogram(
+    'foodgram_request_db_seconds',
+    'Time spent in SQL queries per request.',
+    SECONDS_BUCKETS,
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'foodgram_request_serializer_seconds',
+    'Time spent in top-level serializer to_representation per request.',
+    SECONDS_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    'foodgram_response_size_bytes',
+    'Size of buffered response bodies.',
+    (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000),
+)
+HISTOGRAMS = (
+    REQUEST_DURATION,
+    REQUEST_QUERIES,
+    REQUEST_DB_DURATION,
+    REQUEST_SERIALIZER_DURATION,
+    RESPONSE_SIZE,
+)
+
+
+class RequestMetrics:
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0
+        self.serializer_time = 0
+        self.serializing = False
+        self.lock = threading.Lock()
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            with self.lock:
+                self.queries.append(sql)
+                self.db_time += duration
+
+
+@contextmanager
+def record_queries():
+    metrics = current_request.get()
+    if metrics is None:
+        yield
+        return
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(
+                connection.execute_wrapper(metrics.record_query)
+            )
+        yield
+
+
+class SerializerMetricsMixin:
+
+    def to_representation(self, instance):
+        metrics = current_request.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_time += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == settings.METRICS_PATH:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_request.set(metrics)
+        started = time.perf_counter()
+        try:
+            with record_queries():
+                response = self.get_response(request)
+        finally:
+            current_request.reset(token)
+        self.observe(request, response, metrics, started)
+        return response
+
+    def observe(self, request, response, metrics, started):
+        match = request.resolver_match
+        labels = {
+            'route': match.view_name if match else 'unresolved',
+            'method': request.method,
+        }
+        query_count = len(metrics.queries)
+        REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+        REQUEST_QUERIES.observe(labels, query_count)
+        REQUEST_DB_DURATION.observe(labels, metrics.db_time)
+        REQUEST_SERIALIZER_DURATION.observe(labels, metrics.serializer_time)
+        if not response.streaming:
+            RESPONSE_SIZE.observe(labels, len(response.content))
+        if query_count > settings.QUERY_BUDGET:
+            self.log_over_budget(request, labels['route'], metrics.queries)
+
+    def log_over_budget(self, request, route, queries):
+        templates = Counter(queries)
+        shown = templates.most_common(settings.QUERY_BUDGET_LOG_TEMPLATES)
+        logger.warning(
+            '%s %s (%s) ran %d queries (%d distinct), budget is %d. '
+            'Most repeated:\n%s',
+            request.method,
+            request.get_full_path(),
+            route,
+            len(queries),
+            len(templates),
+            settings.QUERY_BUDGET,
+            '\n'.join(f'{count} x {sql}' for sql, count in shown),
+        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                'All queries of %s %s:\n%s',
+                request.method,
+                request.get_full_path(),
+                '\n'.join(queries),
+            )
+
+
+def metrics_view(request):
+    return HttpResponse(
+        '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n',
+        content_type=CONTENT_TYPE,
+    )
@@ -1,6 +1,290 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import hashlib
+import json
+from functools import reduce
+from operator import attrgetter, or_
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class LookaheadPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self.lookahead_has_next = has_next
+
+    def has_next(self):
+        return self.lookahead_has_next
+
+    def start_index(self):
+        if not self.object_list:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.paginator.per_page * (self.number - 1) + len(self)
+
+
+class CachedCountPaginator(Paginator):
+    approximate = False
+
+    def validate_number(self, number):
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            self.object_list[bottom:bottom + self.per_page + 1]
+        )
+        if not object_list and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        return LookaheadPage(
+            object_list[:self.per_page],
+            number,
+            self,
+            len(object_list) > self.per_page,
+        )
+
+    def get_count_cache_key(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        digest = hashlib.md5(
+            f'{queryset.db}:{sql}:{params!r}'.encode()
+        ).hexdigest()
+        return f'pagination-count:{digest}'
+
+    def estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        try:
+            key = self.get_count_cache_key(queryset)
+        except EmptyResultSet:
+            return 0
+        cached = cache.get(key)
+        if cached is not None:
+            count, self.approximate = cached
+            return count
+        count = self.estimate_count(queryset)
+        self.approximate = (
+            count is not None
+            and count >= settings.PAGINATION_COUNT_ESTIMATE_THRESHOLD
+        )
+        if not self.approximate:
+            count = queryset.count()
+        cache.set(
+            key,
+            (count, self.approximate),
+            settings.PAGINATION_COUNT_CACHE_TIMEOUT,
+        )
+        return count
+
+
+class CachedCountPagination(CustomPagination):
+    django_paginator_class = CachedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_approximate'] = self.page.paginator.approximate
+        return response
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    invalid_cursor_message = 'Неверный курсор'
+
+    def __init__(self, ordering):
+        self.ordering = tuple(ordering)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size < 1:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            reverse, position = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+            if (
+                not isinstance(reverse, bool)
+                or not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or None in position
+            ):
+                raise ValueError
+            position = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return reverse, position
+
+    def encode_cursor(self, reverse, instance):
+        position = [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+        encoded = base64.urlsafe_b64encode(
+            json.dumps([reverse, position], default=str).encode()
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def get_keyset_filter(self, ordering, position):
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition = {
+                previous.lstrip('-'): value
+                for previous, value in zip(ordering[:index], position)
+            }
+            condition[f'{name}__{lookup}'] = position[index]
+            conditions.append(Q(**condition))
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.paginate_querysets((queryset,), request, view)
+
+    def paginate_querysets(self, querysets, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        cursor = self.decode_cursor(request, querysets[0].model)
+        reverse = cursor is not None and cursor[0]
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        results = []
+        for queryset in querysets:
+            queryset = queryset.order_by(*ordering)
+            if cursor is not None:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, cursor[1])
+                )
+            results.extend(queryset[:page_size + 1])
+        if len(querysets) > 1:
+            results = self.merge(results, ordering)
+        has_more = len(results) > page_size
+        self.page = results[:page_size]
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        return self.page
+
+    def merge(self, results, ordering):
+        for field in reversed(ordering):
+            results.sort(
+                key=attrgetter(field.lstrip('-')),
+                reverse=field.startswith('-'),
+            )
+        merged = []
+        seen = set()
+        for instance in results:
+            position = tuple(
+                getattr(instance, field.lstrip('-')) for field in ordering
+            )
+            if position not in seen:
+                seen.add(position)
+                merged.append(instance)
+        return merged
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class OptionalKeysetPagination(CachedCountPagination):
+    mode_query_param = 'pagination'
+    keyset_mode = 'cursor'
+    keyset_paginator = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'keyset_ordering', None)
+        if (
+            ordering
+            and request.query_params.get(self.mode_query_param)
+            == self.keyset_mode
+        ):
+            self.keyset_paginator = KeysetPagination(ordering)
+            return self.keyset_paginator.paginate_queryset(
+                queryset,
+                request,
+                view,
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset_paginator is not None:
+            return self.keyset_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
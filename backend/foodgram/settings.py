@@ -34,6 +34,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -63,6 +64,13 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
+ASGI_APPLICATION = 'foodgram.asgi.application'
+
+ASYNC_VIEWS = os.getenv('SERVER_MODE', 'wsgi') == 'asgi'
+
+METRICS_PATH = '/metrics'
+QUERY_BUDGET = int(os.getenv('QUERY_BUDGET', 30))
+QUERY_BUDGET_LOG_TEMPLATES = 5
 
 DATABASES = {
     'default': {
@@ -75,6 +83,24 @@ DATABASES = {
     }
 }
 
+# Generation counters that invalidate cached responses and in-process
+# indexes live in the default cache. It has to be shared by all processes
+# (Redis, Memcached): with the process-local default a bump made by another
+# worker or by a management command is seen only after the counter expires
+# in GENERATION_LOCAL_TIMEOUT seconds, and `manage.py check` fails when
+# WEB_CONCURRENCY (the gunicorn worker count) is above one.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+GENERATION_LOCAL_TIMEOUT = 30
+WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -119,12 +145,34 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+DEFAULT_FILE_STORAGE = 'foodgram.storage.ContentAddressedStorage'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Constants
 
 MIN_COOKING_TIME = 1
 MIN_INGREDIENT_AMOUNT = 1
+INGREDIENT_SEARCH_LIMIT = 50
+SHOPPING_CART_BUFFER_LIMIT = 1000
+BULK_RECIPES_LIMIT = 100
+SEARCH_CONFIG = 'russian'
+FEED_FANOUT_LIMIT = 5000
+FEED_BACKFILL_LIMIT = 50
+FEED_PULL_AUTHORS_CACHE_TIMEOUT = 600
+ANONYMOUS_CACHE_TIMEOUT = 300
+USER_STATE_CACHE_TIMEOUT = 60
+PAGINATION_COUNT_CACHE_TIMEOUT = 30
+PAGINATION_COUNT_ESTIMATE_THRESHOLD = 100_000
+RECIPE_IMAGE_MAX_SIZE = (1600, 1600)
+RECIPE_IMAGE_MAX_PIXELS = 40_000_000
+RECIPE_IMAGE_QUALITY = 85
+RECIPE_IMAGE_VARIANTS = {
+    'card': (600, 600),
+    'thumbnail': (240, 240),
+}
+RECIPE_IMAGE_ASYNC = True
+RECIPE_IMAGE_WORKERS = 2
 EMPTY_VALUE_DISPLAY = '- Пусто -'
 
 DJOSER = {
@@ -156,7 +204,7 @@ sentry_sdk.init(
         DjangoIntegration(),
     ],
 
-    traces_sample_rate=1.0,
+    traces_sample_rate=float(os.getenv('SENTRY_TRACES_SAMPLE_RATE', 0.05)),
 
     send_default_pii=True
 )
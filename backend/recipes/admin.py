@@ -1,8 +1,23 @@
+from collections import defaultdict
+
 from django.conf import settings as s
 from django.contrib import admin
+from django.db import transaction
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     ShoppingCart, ShoppingCartIngredient, Tag)
+
+
+class ReadOnlyAdminMixin:
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -82,6 +97,33 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     )
     empty_value_display = s.EMPTY_VALUE_DISPLAY
 
+    def update_totals(self, recipe_ingredient, sign=1):
+        ShoppingCartIngredient.objects.apply_recipe_deltas(
+            recipe_ingredient.recipe_id,
+            {recipe_ingredient.ingredient_id: sign * recipe_ingredient.amount},
+        )
+
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change:
+            self.update_totals(
+                RecipeIngredient.objects.get(pk=obj.pk),
+                sign=-1,
+            )
+        super().save_model(request, obj, form, change)
+        self.update_totals(obj)
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        self.update_totals(obj, sign=-1)
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        for recipe_ingredient in queryset:
+            self.update_totals(recipe_ingredient, sign=-1)
+        super().delete_queryset(request, queryset)
+
 
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = (
@@ -116,6 +158,52 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     )
     empty_value_display = s.EMPTY_VALUE_DISPLAY
 
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        if change:
+            old = ShoppingCart.objects.get(pk=obj.pk)
+            ShoppingCartIngredient.objects.remove_recipes(
+                (old.user_id,),
+                (old.recipe_id,),
+            )
+        super().save_model(request, obj, form, change)
+        ShoppingCartIngredient.objects.add_recipes(
+            (obj.user_id,),
+            (obj.recipe_id,),
+        )
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        ShoppingCartIngredient.objects.remove_recipes(
+            (obj.user_id,),
+            (obj.recipe_id,),
+        )
+        super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        recipe_ids = defaultdict(list)
+        for user_id, recipe_id in queryset.values_list('user_id', 'recipe_id'):
+            recipe_ids[user_id].append(recipe_id)
+        for user_id, user_recipe_ids in recipe_ids.items():
+            ShoppingCartIngredient.objects.remove_recipes(
+                (user_id,),
+                user_recipe_ids,
+            )
+        super().delete_queryset(request, queryset)
+
+
+class ShoppingCartIngredientAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'user',
+        'ingredient',
+        'total_amount',
+    )
+    list_filter = (
+        'user',
+    )
+    empty_value_display = s.EMPTY_VALUE_DISPLAY
+
 
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(Tag, TagAdmin)
@@ -123,3 +211,4 @@ admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAdmin)
 admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(ShoppingCartIngredient, ShoppingCartIngredientAdmin)
@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from foodgram.generations import check_shared_cache
+        from . import signals  # noqa: F401
+
+        checks.register(check_shared_cache, checks.Tags.caches)
@@ -0,0 +1,9 @@
+from django.contrib.postgres.search import SearchVectorField as BaseField
+
+
+class SearchVectorField(BaseField):
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return super().db_type(connection)
+        return 'text'
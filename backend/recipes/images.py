@@ -0,0 +1,100 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from foodgram.generations import bump_generation
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.RECIPE_IMAGE_WORKERS,
+    thread_name_prefix='recipe-images',
+)
+
+
+class ImageProcessingError(ValueError):
+    pass
+
+
+def encode_image(image, name, max_size):
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(max_size, Image.Resampling.LANCZOS)
+    has_alpha = (
+        image.mode in ('RGBA', 'LA')
+        or (image.mode == 'P' and 'transparency' in image.info)
+    )
+    buffer = io.BytesIO()
+    if has_alpha:
+        image.convert('RGBA').save(buffer, format='PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.convert('RGB').save(
+            buffer,
+            format='JPEG',
+            quality=settings.RECIPE_IMAGE_QUALITY,
+            optimize=True,
+            progressive=True,
+        )
+        extension = 'jpg'
+    stem = os.path.splitext(os.path.basename(name))[0]
+    return ContentFile(buffer.getvalue(), name=f'{stem}.{extension}')
+
+
+def normalize_image(file):
+    file.seek(0)
+    try:
+        image = Image.open(file)
+        width, height = image.size
+        if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+            raise ImageProcessingError(
+                f'Изображение слишком большое: {width}x{height}'
+            )
+        image.load()
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ImageProcessingError(
+            f'Не удалось обработать изображение: {error}'
+        )
+    return encode_image(image, file.name, settings.RECIPE_IMAGE_MAX_SIZE)
+
+
+def build_image_variants(recipe_id):
+    from .models import Recipe
+
+    recipe = Recipe.objects.filter(pk=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    source_name = recipe.image.name
+    with recipe.image.open('rb') as file:
+        image = Image.open(file)
+        image.load()
+    updates = {}
+    for variant, max_size in settings.RECIPE_IMAGE_VARIANTS.items():
+        content = encode_image(image.copy(), source_name, max_size)
+        field = getattr(recipe, f'image_{variant}')
+        field.save(content.name, content, save=False)
+        updates[f'image_{variant}'] = field.name
+    if Recipe.objects.filter(
+        pk=recipe_id,
+        image=source_name,
+    ).update(**updates):
+        bump_generation('recipes')
+
+
+def run_in_background(recipe_id):
+    try:
+        build_image_variants(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_variants(recipe):
+    recipe_id = recipe.pk
+    if settings.RECIPE_IMAGE_ASYNC:
+        transaction.on_commit(
+            lambda: executor.submit(run_in_background, recipe_id)
+        )
+    else:
+        transaction.on_commit(lambda: build_image_variants(recipe_id))
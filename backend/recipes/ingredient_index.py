@@ -0,0 +1,58 @@
+from bisect import bisect_left
+
+from foodgram.generations import get_generation
+from .models import Ingredient
+
+
+class IngredientIndex:
+    generation_name = 'ingredients'
+
+    def __init__(self):
+        self._snapshot = (None, [], [])
+
+    def load(self):
+        generation = get_generation(self.generation_name)
+        snapshot_generation, keys, entries = self._snapshot
+        if snapshot_generation == generation:
+            return keys, entries
+        entries = sorted(
+            (name.casefold(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id',
+                'name',
+                'measurement_unit',
+            )
+        )
+        keys = [entry[0] for entry in entries]
+        self._snapshot = (generation, keys, entries)
+        return keys, entries
+
+    def search(self, query, limit=None):
+        keys, entries = self.load()
+        prefix = query.casefold()
+        found = []
+        position = bisect_left(keys, prefix)
+        while (
+            position < len(keys)
+            and keys[position].startswith(prefix)
+            and (limit is None or len(found) < limit)
+        ):
+            found.append(entries[position])
+            position += 1
+        if limit is None or len(found) < limit:
+            for entry in entries:
+                if limit is not None and len(found) >= limit:
+                    break
+                if prefix in entry[0] and not entry[0].startswith(prefix):
+                    found.append(entry)
+        return [
+            {
+                'id': pk,
+                'name': name,
+                'measurement_unit': measurement_unit,
+            }
+            for _, pk, name, measurement_unit in found
+        ]
+
+
+ingredient_index = IngredientIndex()
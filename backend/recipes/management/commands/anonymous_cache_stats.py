@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.caching import (get_anonymous_cache_stats,
+                         reset_anonymous_cache_stats)
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows hit and miss counters of the anonymous recipe response '
+        'cache. Use: python manage.py anonymous_cache_stats [--reset]'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true')
+
+    def handle(self, *args, **options):
+        stats = get_anonymous_cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total * 100 if total else 0
+        self.stdout.write(
+            f'hits: {stats["hits"]}, misses: {stats["misses"]}, '
+            f'hit ratio: {ratio:.1f}%'
+        )
+        if options['reset']:
+            reset_anonymous_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Counters reset.'))
@@ -0,0 +1,107 @@
+import statistics
+import threading
+import timeit
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle, islice
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures throughput of a running server under concurrent clients. '
+        'Run it once against the WSGI and once against the ASGI '
+        'deployment to compare them. '
+        'Use: python manage.py bench_concurrency --url http://localhost:8000'
+    )
+
+    DEFAULT_PATHS = (
+        '/api/tags/',
+        '/api/ingredients/?name=а',
+        '/api/recipes/?limit=6',
+    )
+    AUTHENTICATED_PATHS = (
+        '/api/recipes/download_shopping_cart/',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*')
+        parser.add_argument('--url', default='http://localhost:8000')
+        parser.add_argument('--token', help='Auth token for private paths.')
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--timeout', type=float, default=30)
+
+    def get_paths(self, options):
+        if options['paths']:
+            return options['paths']
+        if options['token']:
+            return self.DEFAULT_PATHS + self.AUTHENTICATED_PATHS
+        return self.DEFAULT_PATHS
+
+    def handle(self, *args, **options):
+        paths = self.get_paths(options)
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        local = threading.local()
+
+        def fetch(path):
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            started = timeit.default_timer()
+            try:
+                response = local.session.get(
+                    options['url'] + path,
+                    timeout=options['timeout'],
+                )
+                failed = response.status_code >= 400
+            except requests.RequestException:
+                failed = True
+            return path, timeit.default_timer() - started, failed
+
+        try:
+            requests.get(options['url'] + paths[0], timeout=options['timeout'])
+        except requests.RequestException as error:
+            raise CommandError(f'Server is not reachable: {error}')
+        started = timeit.default_timer()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            results = list(
+                executor.map(
+                    fetch,
+                    islice(cycle(paths), options['requests']),
+                )
+            )
+        elapsed = timeit.default_timer() - started
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{options["requests"]} requests, '
+                f'{options["concurrency"]} clients, {elapsed:.2f} s, '
+                f'{options["requests"] / elapsed:.1f} req/s'
+            )
+        )
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{"path":<45}{"p50, ms":>10}{"p95, ms":>10}{"errors":>8}'
+            )
+        )
+        for path in paths:
+            timings = sorted(
+                duration for result_path, duration, _ in results
+                if result_path == path
+            )
+            if not timings:
+                continue
+            errors = sum(
+                failed for result_path, _, failed in results
+                if result_path == path
+            )
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(
+                f'{path:<45}'
+                f'{statistics.median(timings) * 1000:>10.1f}'
+                f'{p95 * 1000:>10.1f}'
+                f'{errors:>8}'
+            )
@@ -0,0 +1,63 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+
+from api.serializers import IngredientSerializer
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares ingredient autocomplete through the ORM and through '
+        'the in-memory prefix index. '
+        'Use: python manage.py bench_ingredient_search [query ...]'
+    )
+
+    DEFAULT_QUERIES = ('а', 'мо', 'сах', 'кури', 'соль', 'яблоч')
+
+    def add_arguments(self, parser):
+        parser.add_argument('queries', nargs='*')
+        parser.add_argument('--repeat', type=int, default=200)
+        parser.add_argument('--limit', type=int, default=None)
+
+    def orm_search(self, query, limit):
+        queryset = Ingredient.objects.filter(name__startswith=query)
+        if limit:
+            queryset = queryset[:limit]
+        return IngredientSerializer(queryset, many=True).data
+
+    def handle(self, *args, **options):
+        queries = options['queries'] or self.DEFAULT_QUERIES
+        repeat = options['repeat']
+        limit = options['limit']
+        started = timeit.default_timer()
+        ingredient_index.load()
+        self.stdout.write(
+            self.style.HTTP_INFO(
+                f'Index built in '
+                f'{(timeit.default_timer() - started) * 1000:.1f} ms'
+            )
+        )
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{"query":<10}{"orm, ms":>12}{"index, ms":>12}'
+                f'{"orm rows":>10}{"index rows":>12}'
+            )
+        )
+        for query in queries:
+            orm_time = timeit.timeit(
+                lambda: self.orm_search(query, limit),
+                number=repeat,
+            )
+            index_time = timeit.timeit(
+                lambda: ingredient_index.search(query, limit),
+                number=repeat,
+            )
+            self.stdout.write(
+                f'{query:<10}'
+                f'{orm_time / repeat * 1000:>12.3f}'
+                f'{index_time / repeat * 1000:>12.3f}'
+                f'{len(self.orm_search(query, limit)):>10}'
+                f'{len(ingredient_index.search(query, limit)):>12}'
+            )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import build_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-encodes card and thumbnail variants of recipe images. '
+        'Use: python manage.py build_image_variants [--all]'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild variants that already exist as well.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_thumbnail='')
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for number, recipe_id in enumerate(recipe_ids, 1):
+            try:
+                build_image_variants(recipe_id)
+            except OSError as error:
+                self.stdout.write(
+                    self.style.WARNING(f'Recipe {recipe_id}: {error}')
+                )
+            if number % 100 == 0:
+                self.stdout.write(
+                    self.style.HTTP_INFO(f'{number}/{len(recipe_ids)}')
+                )
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {len(recipe_ids)} recipes.')
+        )
@@ -1,72 +1,210 @@
 import csv
+import io
+import json
 import os
+import time
+from itertools import islice
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
-from django.db.models import Max
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
 
+from foodgram.generations import bump_generation
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
-    help = 'Loads data from csv-files. Use: python manage import_csv'
+    help = (
+        'Loads ingredients from csv or json files. Loading is idempotent: '
+        'rows already present by (name, measurement_unit) are skipped. '
+        'Use: python manage.py import_csv [path ...]'
+    )
 
-    MODELS_FILES = {
-        Ingredient: 'ingredients.csv',
-    }
+    DEFAULT_FILES = (
+        'ingredients.csv',
+    )
+    CHUNK_SIZE = 10000
+    JSON_BUFFER_SIZE = 65536
 
-    def start_import(self):
-        directory = f'{settings.DATA_PATH}\n'
-        file_names = "\n".join(list(self.MODELS_FILES.values()))
-        info = ('Data will be added from the following directory:\n'
-                + directory
-                + 'List of files:\n'
-                + file_names)
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths',
+            nargs='*',
+            help='Files to load, relative to BASE_DIR or absolute.',
+        )
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='Input format; detected from the file extension by default.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=self.CHUNK_SIZE,
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use bulk_create even on PostgreSQL.',
+        )
 
+    def start_import(self, paths):
         self.stdout.write(
-            self.style.MIGRATE_HEADING('Start importing data from csv-files')
+            self.style.MIGRATE_HEADING('Start importing ingredients')
         )
         self.stdout.write(
-            self.style.HTTP_INFO(info)
+            self.style.HTTP_INFO(
+                'List of files:\n' + '\n'.join(str(path) for path in paths)
+            )
         )
 
-    def load_data(self):
+    def read_csv(self, file):
+        for line_number, row in enumerate(csv.reader(file), 1):
+            if not row:
+                continue
+            if len(row) != 2:
+                raise CommandError(
+                    f'Line {line_number}: expected name and measurement '
+                    f'unit, got {row}'
+                )
+            yield row[0].strip(), row[1].strip()
+
+    def read_json(self, file):
+        decoder = json.JSONDecoder()
+        buffer = file.read(self.JSON_BUFFER_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError('JSON input must be an array of objects')
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip()
+            if buffer.startswith(','):
+                buffer = buffer[1:].lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                chunk = file.read(self.JSON_BUFFER_SIZE)
+                if not chunk:
+                    raise CommandError('Unexpected end of JSON input')
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            try:
+                yield (
+                    item['name'].strip(),
+                    item['measurement_unit'].strip(),
+                )
+            except (KeyError, TypeError, AttributeError):
+                raise CommandError(f'Invalid ingredient: {item}')
+
+    def read_rows(self, path, file_format):
+        file_format = file_format or os.path.splitext(path)[1][1:].lower()
+        reader = {
+            'csv': self.read_csv,
+            'json': self.read_json,
+        }.get(file_format)
+        if reader is None:
+            raise CommandError(f'Unknown format of {path}')
+        with open(path, 'r', encoding='utf-8') as file:
+            yield from reader(file)
+
+    def chunks(self, rows, chunk_size):
+        rows = iter(rows)
+        chunk = list(islice(rows, chunk_size))
+        while chunk:
+            yield chunk
+            chunk = list(islice(rows, chunk_size))
+
+    def report_progress(self, rows_read, started):
         self.stdout.write(
             self.style.HTTP_INFO(
-                'Loading data to the database...'
+                f'{rows_read} rows read, '
+                f'{time.monotonic() - started:.2f} s'
             )
         )
-        try:
-            for model, file_name in self.MODELS_FILES.items():
-                file_path = os.path.join(
-                    settings.BASE_DIR,
-                    f'{file_name}'
-                )
 
-                try:
-                    last_id = (
-                        Ingredient.objects.aggregate(Max('id'))['id__max']
-                    )
-                except Exception:
-                    last_id = 0
-
-                with open(file_path, 'r', encoding='utf-8') as csv_file:
-                    reader = csv.reader(csv_file)
-                    data = [model(instance_id, *row) for instance_id, row in
-                            enumerate(reader, last_id + 1)]
-                    model.objects.bulk_create(data)
-            self.stdout.write(
-                self.style.SUCCESS(
-                    'Success! Data from csv-files uploaded to the database.'
-                )
+    def copy_chunks(self, chunks, started):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        rows_read = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging ('
+                'name varchar(200), measurement_unit varchar(20)'
+                ') ON COMMIT DROP'
             )
-        except Exception as error:
-            self.stdout.write(
-                self.style.ERROR(
-                    f'Error while uploading: {error}'
+            for chunk in chunks:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer,
                 )
+                rows_read += len(chunk)
+                self.report_progress(rows_read, started)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                f'SELECT DISTINCT name, measurement_unit '
+                f'FROM ingredient_staging '
+                f'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return rows_read, cursor.rowcount
+
+    def bulk_create_chunks(self, chunks, started):
+        rows_read = 0
+        count_before = Ingredient.objects.count()
+        for chunk in chunks:
+            Ingredient.objects.bulk_create(
+                (
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in chunk
+                ),
+                ignore_conflicts=True,
+            )
+            rows_read += len(chunk)
+            self.report_progress(rows_read, started)
+        return rows_read, Ingredient.objects.count() - count_before
+
+    def load_data(self, paths, options):
+        self.stdout.write(
+            self.style.HTTP_INFO('Loading data to the database...')
+        )
+        started = time.monotonic()
+        use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        rows = (
+            row
+            for path in paths
+            for row in self.read_rows(path, options['format'])
+        )
+        chunks = self.chunks(rows, options['chunk_size'])
+        try:
+            with transaction.atomic():
+                if use_copy:
+                    rows_read, created = self.copy_chunks(chunks, started)
+                else:
+                    rows_read, created = self.bulk_create_chunks(
+                        chunks,
+                        started,
+                    )
+        except (OSError, DatabaseError) as error:
+            raise CommandError(f'Error while uploading: {error}')
+        if created:
+            bump_generation('ingredients')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Success! {rows_read} rows read, {created} ingredients '
+                f'added in {time.monotonic() - started:.2f} s.'
             )
+        )
 
     def handle(self, *args, **options):
-        self.start_import()
-        self.load_data()
+        paths = [
+            os.path.join(settings.BASE_DIR, path)
+            for path in options['paths'] or self.DEFAULT_FILES
+        ]
+        self.start_import(paths)
+        self.load_data(paths, options)
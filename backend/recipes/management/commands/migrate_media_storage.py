@@ -0,0 +1,66 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Moves recipe images to content-addressed names. '
+        'Use: python manage.py migrate_media_storage [--delete-originals]'
+    )
+
+    IMAGE_FIELDS = (
+        'image',
+        'image_card',
+        'image_thumbnail',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--delete-originals',
+            action='store_true',
+            help='Remove files that are no longer referenced.',
+        )
+
+    def migrate_file(self, name):
+        with default_storage.open(name, 'rb') as file:
+            return default_storage.save(name, file)
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, 'is_content_addressed'):
+            raise CommandError(
+                'DEFAULT_FILE_STORAGE is not content-addressed'
+            )
+        moved = {}
+        missing = 0
+        for recipe in Recipe.objects.only(*self.IMAGE_FIELDS).iterator():
+            updates = {}
+            for field_name in self.IMAGE_FIELDS:
+                name = getattr(recipe, field_name).name
+                if not name or default_storage.is_content_addressed(name):
+                    continue
+                if name not in moved:
+                    if not default_storage.exists(name):
+                        missing += 1
+                        self.stdout.write(
+                            self.style.WARNING(f'Missing file: {name}')
+                        )
+                        continue
+                    moved[name] = self.migrate_file(name)
+                updates[field_name] = moved[name]
+            if updates:
+                Recipe.objects.filter(pk=recipe.pk).update(**updates)
+        unique_names = set(moved.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Moved {len(moved)} files into {len(unique_names)} '
+                f'unique files, {missing} missing.'
+            )
+        )
+        if options['delete_originals']:
+            for name in moved:
+                default_storage.delete(name)
+            self.stdout.write(
+                self.style.SUCCESS(f'Deleted {len(moved)} original files.')
+            )
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingCartIngredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds shopping cart ingredient totals from the carts. '
+        'Use: python manage.py rebuild_shopping_cart [--check]'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored totals with the live aggregation.',
+        )
+
+    def live_totals(self):
+        return {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingCartIngredient.objects.live_totals()
+        }
+
+    def check_totals(self, live_totals):
+        stored_totals = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingCartIngredient.objects.values_list(
+                'user_id',
+                'ingredient_id',
+                'total_amount',
+            )
+        }
+        mismatches = 0
+        for key in live_totals.keys() | stored_totals.keys():
+            if live_totals.get(key) != stored_totals.get(key):
+                mismatches += 1
+                self.stdout.write(
+                    self.style.WARNING(
+                        f'user {key[0]}, ingredient {key[1]}: '
+                        f'stored {stored_totals.get(key)}, '
+                        f'expected {live_totals.get(key)}'
+                    )
+                )
+        return mismatches
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            live_totals = self.live_totals()
+            if options['check']:
+                mismatches = self.check_totals(live_totals)
+                if mismatches:
+                    raise CommandError(f'{mismatches} totals are out of sync')
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f'All {len(live_totals)} totals are in sync.'
+                    )
+                )
+                return
+            ShoppingCartIngredient.objects.all().delete()
+            ShoppingCartIngredient.objects.bulk_create(
+                (
+                    ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=total_amount,
+                    )
+                    for (user_id, ingredient_id), total_amount
+                    in live_totals.items()
+                ),
+                batch_size=1000,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt {len(live_totals)} totals.')
+        )
@@ -0,0 +1,308 @@
+import json
+import random
+import statistics
+import timeit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import (setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.serializers import RecipeReadSerializer
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from users.models import Subscribe, User
+from users.serializers import SubscribeSerializer
+from users.views import CustomUserViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        'Seeds a reproducible dataset in a test database and measures '
+        'time and query counts of the main read paths against a per-database '
+        'JSON baseline. Only query count growth fails the run unless '
+        '--check-timings is given. '
+        'Use: python manage.py run_benchmarks [--update-baseline]'
+    )
+
+    SEED = 2023
+    USERS = 50
+    RECIPES = 300
+    INGREDIENTS = 500
+    INGREDIENTS_PER_RECIPE = (3, 10)
+    SUBSCRIPTIONS = 12
+    FAVORITES = 30
+    CART = 50
+    PAGE_SIZE = 6
+    RECIPES_LIMIT = 3
+    TIME_SLACK_MS = 0.5
+    BENCHMARKS = (
+        'recipe_read_page',
+        'subscribe_page',
+        'ingredient_list',
+        'ingredient_search',
+        'download_shopping_cart',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='*',
+            help=f'Subset of: {", ".join(self.BENCHMARKS)}.',
+        )
+        parser.add_argument(
+            '--baseline',
+            default=settings.BASE_DIR / 'benchmarks' / 'baseline.json',
+        )
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Allowed relative slowdown of the median time.',
+        )
+        parser.add_argument(
+            '--check-timings',
+            action='store_true',
+            help='Also fail when the median time exceeds the threshold.',
+        )
+
+    def seed(self):
+        rng = random.Random(self.SEED)
+        with open(
+            settings.BASE_DIR / 'data' / 'ingredients.json',
+            encoding='utf-8',
+        ) as file:
+            ingredients = json.load(file)[:self.INGREDIENTS]
+        Ingredient.objects.bulk_create(
+            Ingredient(**ingredient) for ingredient in ingredients
+        )
+        ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        Tag.objects.bulk_create(
+            Tag(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#E26C2D', 'breakfast'),
+                ('Обед', '#49B64E', 'lunch'),
+                ('Ужин', '#8775D2', 'dinner'),
+            )
+        )
+        tag_ids = list(Tag.objects.order_by('id').values_list('id', flat=True))
+        User.objects.bulk_create(
+            User(
+                email=f'user{number}@example.com',
+                username=f'user{number}',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='!',
+            )
+            for number in range(self.USERS)
+        )
+        users = list(User.objects.order_by('id'))
+        self.user, authors = users[0], users[1:]
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=rng.choice(authors),
+                name=f'Рецепт {number}',
+                text='Описание рецепта',
+                cooking_time=rng.randint(1, 120),
+                image='recipe_img/benchmark.png',
+            )
+            for number in range(self.RECIPES)
+        )
+        recipe_ids = list(
+            Recipe.objects.order_by('id').values_list('id', flat=True)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in rng.sample(
+                ingredient_ids,
+                rng.randint(*self.INGREDIENTS_PER_RECIPE),
+            )
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in rng.sample(tag_ids, rng.randint(1, len(tag_ids)))
+        )
+        Subscribe.objects.bulk_create(
+            Subscribe(user=self.user, author=author)
+            for author in rng.sample(authors, self.SUBSCRIPTIONS)
+        )
+        Favorite.objects.bulk_create(
+            Favorite(user=self.user, recipe_id=recipe_id)
+            for recipe_id in rng.sample(recipe_ids, self.FAVORITES)
+        )
+        cart_ids = rng.sample(recipe_ids, self.CART)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=self.user, recipe_id=recipe_id)
+            for recipe_id in cart_ids
+        )
+        ShoppingCartIngredient.objects.add_recipes((self.user.pk,), cart_ids)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_request(self, path):
+        request = Request(APIRequestFactory().get(path))
+        request.user = self.user
+        return request
+
+    def get(self, path):
+        response = self.client.get(path)
+        if response.status_code != 200:
+            raise CommandError(f'{path} answered {response.status_code}')
+        return response
+
+    def bench_recipe_read_page(self):
+        request = self.make_request('/api/recipes/')
+        return RecipeReadSerializer(
+            Recipe.objects.with_related()[:self.PAGE_SIZE],
+            many=True,
+            context={'request': request},
+        ).data
+
+    def bench_subscribe_page(self):
+        request = self.make_request(
+            f'/api/users/subscriptions/?recipes_limit={self.RECIPES_LIMIT}'
+        )
+        authors = list(
+            User.objects.filter(
+                subscribe__user=self.user,
+            ).annotate(
+                recipes_count=Count('recipes'),
+            ).order_by('id')[:self.PAGE_SIZE]
+        )
+        CustomUserViewSet().attach_latest_recipes(
+            authors,
+            self.RECIPES_LIMIT,
+        )
+        return SubscribeSerializer(
+            authors,
+            many=True,
+            context={'request': request},
+        ).data
+
+    def bench_ingredient_list(self):
+        return self.get('/api/ingredients/')
+
+    def bench_ingredient_search(self):
+        return self.get('/api/ingredients/?name=абр')
+
+    def bench_download_shopping_cart(self):
+        return self.get('/api/recipes/download_shopping_cart/')
+
+    def measure(self, benchmark, repeat):
+        queries = []
+
+        def count_query(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        cache.clear()
+        with connection.execute_wrapper(count_query):
+            benchmark()
+        timings = timeit.repeat(benchmark, number=1, repeat=repeat)
+        return {
+            'queries': len(queries),
+            'median_ms': round(statistics.median(timings) * 1000, 3),
+        }
+
+    def load_baseline(self, path):
+        try:
+            with open(path, encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def compare(self, name, result, expected, threshold, check_timings):
+        if expected is None:
+            return 'new'
+        problems = []
+        if result['queries'] > expected['queries']:
+            problems.append(
+                f'queries {expected["queries"]} -> {result["queries"]}'
+            )
+        allowed = expected['median_ms'] * (1 + threshold) + self.TIME_SLACK_MS
+        slower = result['median_ms'] > allowed
+        if slower and check_timings:
+            problems.append(
+                f'time {expected["median_ms"]} -> {result["median_ms"]} ms'
+            )
+        if problems:
+            self.regressions.append(f'{name}: {", ".join(problems)}')
+            return 'REGRESSION'
+        return 'slower' if slower else 'ok'
+
+    def handle(self, *args, **options):
+        names = options['benchmarks'] or self.BENCHMARKS
+        unknown = set(names) - set(self.BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                f'Unknown benchmarks: {", ".join(sorted(unknown))}'
+            )
+        baseline = self.load_baseline(options['baseline'])
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            vendor = connection.vendor
+            expected = baseline.get(vendor, {})
+            self.seed()
+            results = {
+                name: self.measure(
+                    getattr(self, f'bench_{name}'),
+                    options['repeat'],
+                )
+                for name in names
+            }
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+        self.regressions = []
+        if not expected and not options['update_baseline']:
+            self.stdout.write(self.style.WARNING(
+                f'No {vendor} baseline in {options["baseline"]}, '
+                f'run with --update-baseline to record one.'
+            ))
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'{"benchmark":<26}{"queries":>8}{"base":>6}'
+                f'{"median, ms":>12}{"base":>10}  status ({vendor})'
+            )
+        )
+        for name, result in results.items():
+            base = expected.get(name)
+            status = self.compare(
+                name,
+                result,
+                base,
+                options['threshold'],
+                options['check_timings'],
+            )
+            self.stdout.write(
+                f'{name:<26}{result["queries"]:>8}'
+                f'{base["queries"] if base else "-":>6}'
+                f'{result["median_ms"]:>12.3f}'
+                f'{base["median_ms"] if base else "-":>10}  {status}'
+            )
+        if options['update_baseline']:
+            baseline[vendor] = {**expected, **results}
+            with open(options['baseline'], 'w', encoding='utf-8') as file:
+                json.dump(baseline, file, indent=4, sort_keys=True)
+                file.write('\n')
+            self.stdout.write(self.style.SUCCESS('Baseline updated.'))
+        elif self.regressions:
+            raise CommandError(
+                'Regressions found:\n' + '\n'.join(self.regressions)
+            )
@@ -0,0 +1,456 @@
+import io
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from foodgram.generations import bump_generation
+from recipes.models import (PULL_AUTHORS_CACHE_KEY, Favorite, FeedEntry,
+                            Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartIngredient, Tag)
+from users.models import Subscribe, User
+
+
+class ZipfSampler:
+
+    def __init__(self, ids, skew, rng):
+        self.ids = list(ids)
+        rng.shuffle(self.ids)
+        self.cum_weights = list(
+            accumulate(
+                1 / rank ** skew
+                for rank in range(1, len(self.ids) + 1)
+            )
+        )
+
+    def sample(self, rng, count):
+        return set(
+            rng.choices(self.ids, cum_weights=self.cum_weights, k=count)
+        )
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates users, recipes and social graph rows with Zipf-skewed '
+        'popularity for load testing. '
+        'Use: python manage.py seed_load --users 100000 --recipes 1000000'
+    )
+
+    DEFAULT_TAGS = (
+        ('Завтрак', '#E26C2D', 'breakfast'),
+        ('Обед', '#49B64E', 'lunch'),
+        ('Ужин', '#8775D2', 'dinner'),
+    )
+    WORDS = (
+        'домашний', 'быстрый', 'летний', 'острый', 'сырный', 'запечённый',
+        'постный', 'праздничный', 'овощной', 'сливочный', 'пирог', 'суп',
+        'салат', 'рагу', 'паста', 'омлет', 'каша', 'котлеты', 'соус',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--recipes', type=int, default=100_000)
+        parser.add_argument(
+            '--ingredients-per-recipe',
+            type=int,
+            default=8,
+            help='Average number of ingredients in a recipe.',
+        )
+        parser.add_argument(
+            '--subscriptions',
+            type=int,
+            default=20,
+            help='Average number of subscriptions per user.',
+        )
+        parser.add_argument(
+            '--favorites',
+            type=int,
+            default=30,
+            help='Average number of favorite recipes per user.',
+        )
+        parser.add_argument(
+            '--cart',
+            type=int,
+            default=5,
+            help='Average number of recipes in a shopping cart.',
+        )
+        parser.add_argument(
+            '--skew',
+            type=float,
+            default=1.1,
+            help='Zipf exponent of author and recipe popularity.',
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10_000,
+            help='Approximate number of rows written per statement.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Parallel writers; SQLite always uses one.',
+        )
+        parser.add_argument(
+            '--no-copy',
+            action='store_true',
+            help='Use INSERT even on PostgreSQL.',
+        )
+
+    def rng(self, *parts):
+        return random.Random(
+            ':'.join(str(part) for part in (self.seed, *parts))
+        )
+
+    def prepare_value(self, value):
+        if value is None:
+            return '\\N'
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+        return str(value).replace(
+            '\\', '\\\\',
+        ).replace(
+            '\t', '\\t',
+        ).replace(
+            '\n', '\\n',
+        ).replace(
+            '\r', '\\r',
+        )
+
+    def write_rows(self, model, names, rows):
+        quote_name = connection.ops.quote_name
+        opts = model._meta
+        fields = [opts.get_field(name) for name in names]
+        table = quote_name(opts.db_table)
+        columns = ', '.join(quote_name(field.column) for field in fields)
+        rows = [
+            [
+                field.get_db_prep_save(value, connection)
+                for field, value in zip(fields, row)
+            ]
+            for row in rows
+        ]
+        if not rows:
+            return 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            if self.use_copy:
+                buffer = io.StringIO()
+                for row in rows:
+                    buffer.write(
+                        '\t'.join(self.prepare_value(value) for value in row)
+                    )
+                    buffer.write('\n')
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f'COPY {table} ({columns}) FROM STDIN',
+                    buffer,
+                )
+            else:
+                placeholders = ', '.join(['%s'] * len(fields))
+                cursor.executemany(
+                    f'INSERT INTO {table} ({columns}) '
+                    f'VALUES ({placeholders})',
+                    rows,
+                )
+        return len(rows)
+
+    def run_chunks(self, title, write_chunk, first_id, total, per_row=1):
+        started = time.monotonic()
+        step = max(1, self.chunk_size // max(1, per_row))
+        chunks = [
+            (start, min(start + step, first_id + total))
+            for start in range(first_id, first_id + total, step)
+        ]
+
+        def run(chunk):
+            try:
+                return write_chunk(*chunk)
+            finally:
+                if self.workers > 1:
+                    connection.close()
+
+        written = 0
+        if self.workers > 1:
+            with ThreadPoolExecutor(self.workers) as executor:
+                for rows in executor.map(run, chunks):
+                    written += rows
+        else:
+            for chunk in chunks:
+                written += run(chunk)
+        self.stdout.write(
+            self.style.HTTP_INFO(
+                f'{title}: {written} rows, '
+                f'{time.monotonic() - started:.2f} s'
+            )
+        )
+        return written
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def prepare_reference_data(self):
+        call_command(
+            'import_csv',
+            str(settings.BASE_DIR / 'data' / 'ingredients.json'),
+            stdout=io.StringIO(),
+        )
+        if not Tag.objects.exists():
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in self.DEFAULT_TAGS
+            )
+            bump_generation('tags')
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by('id').values_list('id', flat=True)
+        )
+        self.tag_ids = list(
+            Tag.objects.order_by('id').values_list('id', flat=True)
+        )
+
+    def write_users(self, start, stop):
+        now = timezone.now()
+        return self.write_rows(
+            User,
+            (
+                'id', 'password', 'is_superuser', 'username', 'first_name',
+                'last_name', 'email', 'is_staff', 'is_active', 'date_joined',
+            ),
+            (
+                (
+                    user_id, '!', False, f'seed{user_id}', 'Имя', 'Фамилия',
+                    f'seed{user_id}@example.com', False, True, now,
+                )
+                for user_id in range(start, stop)
+            ),
+        )
+
+    def write_recipes(self, start, stop):
+        rng = self.rng('recipes', start)
+        seconds = self.options['days'] * 24 * 60 * 60
+        rows = []
+        for recipe_id in range(start, stop):
+            words = rng.sample(self.WORDS, 3)
+            rows.append((
+                recipe_id,
+                next(iter(self.authors.sample(rng, 1))),
+                self.now - timedelta(seconds=rng.uniform(0, seconds)),
+                ' '.join(words).capitalize(),
+                f'{" ".join(rng.sample(self.WORDS, 8))}.',
+                rng.randint(settings.MIN_COOKING_TIME, 180),
+                'recipe_img/seed.png',
+                '',
+                '',
+            ))
+        return self.write_rows(
+            Recipe,
+            (
+                'id', 'author', 'pub_date', 'name', 'text', 'cooking_time',
+                'image', 'image_card', 'image_thumbnail',
+            ),
+            rows,
+        )
+
+    def write_recipe_ingredients(self, start, stop):
+        rng = self.rng('recipe_ingredients', start)
+        average = self.options['ingredients_per_recipe']
+        return self.write_rows(
+            RecipeIngredient,
+            ('recipe', 'ingredient', 'amount'),
+            [
+                (recipe_id, ingredient_id, rng.randint(1, 500))
+                for recipe_id in range(start, stop)
+                for ingredient_id in rng.sample(
+                    self.ingredient_ids,
+                    min(
+                        len(self.ingredient_ids),
+                        rng.randint(1, 2 * average - 1),
+                    ),
+                )
+            ],
+        )
+
+    def write_recipe_tags(self, start, stop):
+        rng = self.rng('recipe_tags', start)
+        return self.write_rows(
+            Recipe.tags.through,
+            ('recipe', 'tag'),
+            [
+                (recipe_id, tag_id)
+                for recipe_id in range(start, stop)
+                for tag_id in rng.sample(
+                    self.tag_ids,
+                    rng.randint(1, min(2, len(self.tag_ids))),
+                )
+            ],
+        )
+
+    def user_relation_writer(self, model, name, sampler, average):
+
+        def write_chunk(start, stop):
+            rng = self.rng(name, start)
+            rows = []
+            for user_id in range(start, stop):
+                targets = sampler.sample(rng, rng.randint(0, 2 * average))
+                if model is Subscribe:
+                    targets.discard(user_id)
+                rows.extend(
+                    (user_id, target_id) for target_id in sorted(targets)
+                )
+            return self.write_rows(model, ('user', name), rows)
+
+        return write_chunk
+
+    def rebuild_cart_totals(self, start, stop):
+        totals = RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user__gte=start,
+            recipe__shopping_cart__user__lt=stop,
+        ).values(
+            'ingredient',
+            user=F('recipe__shopping_cart__user'),
+        ).annotate(
+            total_amount=Sum('amount'),
+        ).values_list('user', 'ingredient', 'total_amount')
+        return self.write_rows(
+            ShoppingCartIngredient,
+            ('user', 'ingredient', 'total_amount'),
+            totals,
+        )
+
+    def update_search_vectors(self, start, stop):
+        return Recipe.objects.filter(
+            pk__gte=start,
+            pk__lt=stop,
+        ).update_search_vector()
+
+    def backfill_feed(self, first_user_id):
+        started = time.monotonic()
+        cache.delete(PULL_AUTHORS_CACHE_KEY)
+        with transaction.atomic():
+            written = FeedEntry.objects.backfill_all(first_user_id)
+        self.stdout.write(
+            self.style.HTTP_INFO(
+                f'Feed entries: {written} rows, '
+                f'{time.monotonic() - started:.2f} s'
+            )
+        )
+
+    def reset_sequences(self):
+        statements = connection.ops.sequence_reset_sql(
+            no_style(),
+            (User, Recipe),
+        )
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.seed = options['seed']
+        self.chunk_size = options['chunk_size']
+        self.workers = max(1, options['workers'])
+        if connection.vendor == 'sqlite':
+            self.workers = 1
+        self.use_copy = (
+            connection.vendor == 'postgresql' and not options['no_copy']
+        )
+        self.now = timezone.now()
+        users, recipes = options['users'], options['recipes']
+        if users < 2 or recipes < 1:
+            raise CommandError('Need at least two users and one recipe.')
+        started = time.monotonic()
+        self.stdout.write(
+            self.style.MIGRATE_HEADING(
+                f'Seeding {users} users and {recipes} recipes '
+                f'(seed {self.seed}, skew {options["skew"]}, '
+                f'{self.workers} workers)'
+            )
+        )
+        try:
+            self.prepare_reference_data()
+            first_user_id = self.next_id(User)
+            first_recipe_id = self.next_id(Recipe)
+            user_ids = range(first_user_id, first_user_id + users)
+            recipe_ids = range(first_recipe_id, first_recipe_id + recipes)
+            self.authors = ZipfSampler(
+                user_ids,
+                options['skew'],
+                self.rng('authors'),
+            )
+            popular_recipes = ZipfSampler(
+                recipe_ids,
+                options['skew'],
+                self.rng('popular_recipes'),
+            )
+            self.run_chunks('Users', self.write_users, first_user_id, users)
+            self.reset_sequences()
+            self.run_chunks(
+                'Recipes',
+                self.write_recipes,
+                first_recipe_id,
+                recipes,
+            )
+            self.reset_sequences()
+            self.run_chunks(
+                'Recipe ingredients',
+                self.write_recipe_ingredients,
+                first_recipe_id,
+                recipes,
+                options['ingredients_per_recipe'],
+            )
+            self.run_chunks(
+                'Recipe tags',
+                self.write_recipe_tags,
+                first_recipe_id,
+                recipes,
+            )
+            for title, model, name, sampler, average in (
+                ('Subscriptions', Subscribe, 'author', self.authors,
+                 options['subscriptions']),
+                ('Favorites', Favorite, 'recipe', popular_recipes,
+                 options['favorites']),
+                ('Shopping carts', ShoppingCart, 'recipe', popular_recipes,
+                 options['cart']),
+            ):
+                self.run_chunks(
+                    title,
+                    self.user_relation_writer(model, name, sampler, average),
+                    first_user_id,
+                    users,
+                    average,
+                )
+            self.run_chunks(
+                'Shopping cart totals',
+                self.rebuild_cart_totals,
+                first_user_id,
+                users,
+                options['cart'] * options['ingredients_per_recipe'],
+            )
+            self.run_chunks(
+                'Search vectors',
+                self.update_search_vectors,
+                first_recipe_id,
+                recipes,
+            )
+            self.backfill_feed(first_user_id)
+        except DatabaseError as error:
+            raise CommandError(f'Error while seeding: {error}')
+        for name in ('users', 'recipes', 'recipe_ingredients'):
+            bump_generation(name)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Done in {time.monotonic() - started:.2f} s.'
+            )
+        )
@@ -0,0 +1,76 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:39
+
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartIngredient = apps.get_model(
+        'recipes', 'ShoppingCartIngredient')
+    duplicates = Ingredient.objects.values(
+        'name',
+        'measurement_unit',
+    ).annotate(
+        keeper=models.Min('id'),
+        total=models.Count('id'),
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        keeper = duplicate['keeper']
+        extra_ids = list(
+            Ingredient.objects.filter(
+                name=duplicate['name'],
+                measurement_unit=duplicate['measurement_unit'],
+            ).exclude(id=keeper).values_list('id', flat=True)
+        )
+        for model, owner, amount in (
+            (RecipeIngredient, 'recipe_id', 'amount'),
+            (ShoppingCartIngredient, 'user_id', 'total_amount'),
+        ):
+            for row in model.objects.filter(ingredient_id__in=extra_ids):
+                kept = model.objects.filter(
+                    ingredient_id=keeper,
+                    **{owner: getattr(row, owner)},
+                ).first()
+                if kept is None:
+                    row.ingredient_id = keeper
+                    row.save(update_fields=('ingredient',))
+                else:
+                    setattr(
+                        kept,
+                        amount,
+                        getattr(kept, amount) + getattr(row, amount),
+                    )
+                    kept.save(update_fields=(amount,))
+                    row.delete()
+        Ingredient.objects.filter(id__in=extra_ids).delete()
+
+
+def reset_ingredient_sequence(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    connection = schema_editor.connection
+    for sql in connection.ops.sequence_reset_sql(no_style(), [Ingredient]):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            reset_ingredient_sequence,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:45
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+import recipes.fields
+
+
+def fill_search_vector(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    if schema_editor.connection.vendor == 'postgresql':
+        Recipe.objects.update(
+            search_vector=(
+                SearchVector(
+                    'name',
+                    weight='A',
+                    config=settings.SEARCH_CONFIG,
+                )
+                + SearchVector(
+                    'text',
+                    weight='B',
+                    config=settings.SEARCH_CONFIG,
+                )
+            ),
+        )
+        return
+    for pk, name, text in Recipe.objects.values_list('pk', 'name', 'text'):
+        Recipe.objects.filter(pk=pk).update(
+            search_vector=f'{name}\n{text}'.lower(),
+        )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_idx '
+            'ON recipes_recipe USING gin (search_vector)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=recipes.fields.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            fill_search_vector,
+            migrations.RunPython.noop,
+        ),
+        migrations.RunPython(
+            create_search_index,
+            drop_search_index,
+        ),
+    ]
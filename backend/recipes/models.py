@@ -1,10 +1,21 @@
 from django.conf import settings as s
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.core.cache import cache
 from django.core.validators import MinValueValidator, RegexValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import (Case, Count, F, Prefetch, Q, Sum, Value, When,
+                              Window)
+from django.db.models.functions import Greatest, RowNumber
+
+from users.models import Subscribe
+from .fields import SearchVectorField
 
 User = get_user_model()
 
+PULL_AUTHORS_CACHE_KEY = 'feed:pull-authors'
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -21,6 +32,15 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'name',
+                    'measurement_unit',
+                ),
+                name='unique_ingredient',
+            ),
+        )
 
     def __str__(self):
         return f'{self.name}, {self.measurement_unit}'
@@ -58,6 +78,90 @@ class Tag(models.Model):
         return f'{self.name}, {self.color}'
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def with_related(self):
+        return self.defer(
+            'search_vector',
+        ).select_related(
+            'author',
+        ).prefetch_related(
+            'tags',
+            Prefetch(
+                'recipeingredient_set',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient',
+                ),
+            ),
+        )
+
+    def latest_by_author(self, limit):
+        ranked = self.order_by().annotate(
+            author_position=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            ),
+        ).values(
+            'id',
+            'author_id',
+            'name',
+            'image',
+            'image_card',
+            'image_thumbnail',
+            'cooking_time',
+            'pub_date',
+            'author_position',
+        )
+        sql, params = ranked.query.sql_with_params()
+        return self.model.objects.raw(
+            f'SELECT * FROM ({sql}) ranked '
+            f'WHERE ranked.author_position <= %s '
+            f'ORDER BY ranked.author_id, ranked.author_position',
+            (*params, limit),
+        )
+
+    def search(self, query):
+        if connections[self.db].vendor == 'postgresql':
+            search_query = SearchQuery(
+                query,
+                config=s.SEARCH_CONFIG,
+                search_type='websearch',
+            )
+            return self.filter(
+                search_vector=search_query,
+            ).annotate(
+                search_rank=SearchRank(F('search_vector'), search_query),
+            ).order_by('-search_rank', '-pub_date', '-id')
+        return self.filter(*(
+            Q(search_vector__contains=word)
+            for word in query.lower().split()
+        ))
+
+    def update_search_vector(self):
+        if connections[self.db].vendor == 'postgresql':
+            return self.update(
+                search_vector=(
+                    SearchVector(
+                        'name',
+                        weight='A',
+                        config=s.SEARCH_CONFIG,
+                    )
+                    + SearchVector(
+                        'text',
+                        weight='B',
+                        config=s.SEARCH_CONFIG,
+                    )
+                ),
+            )
+        updated = 0
+        for pk, name, text in self.values_list('pk', 'name', 'text'):
+            updated += self.model.objects.filter(pk=pk).update(
+                search_vector=f'{name}\n{text}'.lower(),
+            )
+        return updated
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -101,17 +205,45 @@ class Recipe(models.Model):
         help_text='Изображение рецепта',
         upload_to='recipe_img/',
     )
+    image_card = models.ImageField(
+        verbose_name='Изображение для карточки',
+        upload_to='recipe_img/card/',
+        blank=True,
+        editable=False,
+    )
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра изображения',
+        upload_to='recipe_img/thumbnail/',
+        blank=True,
+        editable=False,
+    )
     tags = models.ManyToManyField(
         Tag,
         related_name='recipes',
         verbose_name='Теги рецепта',
         help_text='Теги рецепта',
     )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=(
+                    '-pub_date',
+                    '-id',
+                ),
+                name='recipe_pub_date_id_idx',
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -153,6 +285,81 @@ class RecipeIngredient(models.Model):
         )
 
 
+class UserRecipeQuerySet(models.QuerySet):
+
+    def get_insert_sql(self, connection, count, returning=''):
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        recipe_opts = Recipe._meta
+        placeholders = ', '.join(['%s'] * count)
+        return (
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote_name(opts.db_table)} ('
+            f'{quote_name(opts.get_field("user").column)}, '
+            f'{quote_name(opts.get_field("recipe").column)}'
+            f') SELECT %s, {quote_name(recipe_opts.pk.column)} '
+            f'FROM {quote_name(recipe_opts.db_table)} '
+            f'WHERE {quote_name(recipe_opts.pk.column)} IN ({placeholders}) '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)} {returning}'
+        )
+
+    def add(self, user, recipe_id):
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self.get_insert_sql(connection, 1),
+                (user.pk, recipe_id),
+            )
+            return cursor.rowcount > 0
+
+    def remove(self, user, recipe_id):
+        deleted, _ = self.filter(user=user, recipe_id=recipe_id).delete()
+        return deleted > 0
+
+    def add_many(self, user, recipe_ids):
+        connection = connections[self.db]
+        if not recipe_ids:
+            return []
+        if not connection.features.can_return_columns_from_insert:
+            return [
+                recipe_id for recipe_id in recipe_ids
+                if self.add(user, recipe_id)
+            ]
+        returning, _ = connection.ops.return_insert_columns(
+            (self.model._meta.get_field('recipe'),),
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                self.get_insert_sql(connection, len(recipe_ids), returning),
+                (user.pk, *recipe_ids),
+            )
+            return [recipe_id for recipe_id, in cursor.fetchall()]
+
+    def remove_many(self, user, recipe_ids):
+        connection = connections[self.db]
+        if not recipe_ids:
+            return []
+        if not connection.features.can_return_columns_from_insert:
+            return [
+                recipe_id for recipe_id in recipe_ids
+                if self.remove(user, recipe_id)
+            ]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        recipe_field = opts.get_field('recipe')
+        returning, _ = connection.ops.return_insert_columns((recipe_field,))
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {quote_name(opts.db_table)} '
+                f'WHERE {quote_name(opts.get_field("user").column)} = %s '
+                f'AND {quote_name(recipe_field.column)} IN ({placeholders}) '
+                f'{returning}',
+                (user.pk, *recipe_ids),
+            )
+            return [recipe_id for recipe_id, in cursor.fetchall()]
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User,
@@ -169,6 +376,8 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Избранное'
         verbose_name_plural = 'Избранное'
@@ -200,6 +409,8 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
     )
 
+    objects = UserRecipeQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
@@ -215,3 +426,333 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'Список покупок: {self.user} - {self.recipe}'
+
+
+class ShoppingCartIngredientQuerySet(models.QuerySet):
+
+    def apply_deltas(self, user_ids, deltas):
+        deltas = {
+            ingredient_id: delta
+            for ingredient_id, delta in deltas.items()
+            if delta
+        }
+        if not deltas:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=0,
+                )
+                for user_id in user_ids
+                for ingredient_id, delta in deltas.items()
+                if delta > 0
+            ),
+            ignore_conflicts=True,
+        )
+        rows = self.filter(user__in=user_ids, ingredient__in=deltas)
+        rows.update(
+            total_amount=Greatest(
+                F('total_amount') + Case(
+                    *(
+                        When(ingredient_id=ingredient_id, then=Value(delta))
+                        for ingredient_id, delta in deltas.items()
+                    ),
+                    output_field=models.IntegerField(),
+                ),
+                Value(0),
+            ),
+        )
+        rows.filter(total_amount=0).delete()
+
+    def apply_recipe_deltas(self, recipe_id, deltas):
+        self.apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id,
+            ).values_list('user_id', flat=True),
+            deltas,
+        )
+
+    def add_recipes(self, user_ids, recipe_ids, sign=1):
+        amounts = RecipeIngredient.objects.filter(
+            recipe__in=recipe_ids,
+        ).values(
+            'ingredient',
+        ).annotate(
+            total_amount=Sum('amount'),
+        ).values_list('ingredient', 'total_amount')
+        self.apply_deltas(
+            user_ids,
+            {
+                ingredient_id: sign * total_amount
+                for ingredient_id, total_amount in amounts
+            },
+        )
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        self.add_recipes(user_ids, recipe_ids, sign=-1)
+
+    def live_totals(self):
+        return RecipeIngredient.objects.filter(
+            recipe__shopping_cart__isnull=False,
+        ).values(
+            'ingredient',
+            user=F('recipe__shopping_cart__user'),
+        ).annotate(
+            total_amount=Sum('amount'),
+        ).values_list('user', 'ingredient', 'total_amount')
+
+
+class ShoppingCartIngredient(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        related_name='shopping_cart_ingredients',
+        on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+    )
+
+    objects = ShoppingCartIngredientQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'user',
+                    'ingredient',
+                ),
+                name='unique_shopping_cart_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user}: {self.ingredient} - {self.total_amount}'
+
+
+class FeedEntryQuerySet(models.QuerySet):
+
+    def pull_author_ids(self):
+        author_ids = cache.get(PULL_AUTHORS_CACHE_KEY)
+        if author_ids is None:
+            author_ids = frozenset(
+                Subscribe.objects.values(
+                    'author',
+                ).annotate(
+                    total=Count('id'),
+                ).filter(
+                    total__gt=s.FEED_FANOUT_LIMIT,
+                ).values_list('author', flat=True)
+            )
+            cache.set(
+                PULL_AUTHORS_CACHE_KEY,
+                author_ids,
+                s.FEED_PULL_AUTHORS_CACHE_TIMEOUT,
+            )
+        return author_ids
+
+    def fan_out(self, recipe):
+        if recipe.author_id in self.pull_author_ids():
+            return 0
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        subscribe_opts = Subscribe._meta
+        columns = ', '.join(
+            quote_name(opts.get_field(name).column)
+            for name in ('user', 'recipe', 'author', 'pub_date')
+        )
+        sql = (
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote_name(opts.db_table)} ({columns}) '
+            f'SELECT {quote_name(subscribe_opts.get_field("user").column)}, '
+            f'%s, %s, %s FROM {quote_name(subscribe_opts.db_table)} '
+            f'WHERE {quote_name(subscribe_opts.get_field("author").column)} '
+            f'= %s {connection.ops.ignore_conflicts_suffix_sql(True)}'
+        )
+        pub_date = opts.get_field('pub_date').get_db_prep_value(
+            recipe.pub_date,
+            connection,
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql,
+                (recipe.pk, recipe.author_id, pub_date, recipe.author_id),
+            )
+            return cursor.rowcount
+
+    def backfill(self, user_id, author_id):
+        if author_id in self.pull_author_ids():
+            return
+        recipes = Recipe.objects.filter(
+            author_id=author_id,
+        ).order_by(
+            '-pub_date',
+            '-id',
+        ).values_list('id', 'pub_date')[:s.FEED_BACKFILL_LIMIT]
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id,
+                    pub_date=pub_date,
+                )
+                for recipe_id, pub_date in recipes
+            ),
+            ignore_conflicts=True,
+        )
+
+    def backfill_all(
+        self,
+        first_user_id=None,
+        recipe_model=Recipe,
+        subscribe_model=Subscribe,
+    ):
+        connection = connections[self.db]
+        quote_name = connection.ops.quote_name
+        opts = self.model._meta
+        subscribe_opts = subscribe_model._meta
+        user_column = quote_name(subscribe_opts.get_field('user').column)
+        author_column = quote_name(subscribe_opts.get_field('author').column)
+        columns = ', '.join(
+            quote_name(opts.get_field(name).column)
+            for name in ('user', 'recipe', 'author', 'pub_date')
+        )
+        ranked_sql, ranked_params = recipe_model.objects.order_by().annotate(
+            author_position=Window(
+                expression=RowNumber(),
+                partition_by=F('author_id'),
+                order_by=(F('pub_date').desc(), F('id').desc()),
+            ),
+        ).values(
+            'id',
+            'author_id',
+            'pub_date',
+            'author_position',
+        ).query.get_compiler(self.db).as_sql()
+        pull_sql, pull_params = subscribe_model.objects.order_by().values(
+            'author',
+        ).annotate(
+            total=Count('id'),
+        ).filter(
+            total__gt=s.FEED_FANOUT_LIMIT,
+        ).values('author').query.get_compiler(self.db).as_sql()
+        conditions = [
+            'ranked.author_position <= %s',
+            f'subscribe.{author_column} NOT IN ({pull_sql})',
+        ]
+        params = [*ranked_params, s.FEED_BACKFILL_LIMIT, *pull_params]
+        if first_user_id is not None:
+            conditions.append(f'subscribe.{user_column} >= %s')
+            params.append(first_user_id)
+        sql = (
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{quote_name(opts.db_table)} ({columns}) '
+            f'SELECT subscribe.{user_column}, ranked.id, '
+            f'ranked.author_id, ranked.pub_date '
+            f'FROM {quote_name(subscribe_opts.db_table)} subscribe '
+            f'INNER JOIN ({ranked_sql}) ranked '
+            f'ON ranked.author_id = subscribe.{author_column} '
+            f'WHERE {" AND ".join(conditions)} '
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def prune(self, user_id, author_id):
+        return self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def timeline_sources(self, user):
+        sources = [
+            self.filter(user=user).only('recipe', 'pub_date'),
+        ]
+        pull_author_ids = self.pull_author_ids()
+        if pull_author_ids:
+            followed = list(
+                Subscribe.objects.filter(
+                    user=user,
+                    author__in=pull_author_ids,
+                ).values_list('author', flat=True)
+            )
+            if followed:
+                sources.append(
+                    Recipe.objects.filter(
+                        author__in=followed,
+                    ).annotate(
+                        recipe_id=F('id'),
+                    ).only('pub_date')
+                )
+        return sources
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        related_name='feed_entries',
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name='Автор',
+        related_name='+',
+        on_delete=models.CASCADE,
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    objects = FeedEntryQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=(
+                    'user',
+                    'recipe',
+                ),
+                name='unique_feed_entry',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=(
+                    'user',
+                    '-pub_date',
+                    '-recipe',
+                ),
+                name='feed_entry_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=(
+                    'user',
+                    'author',
+                ),
+                name='feed_entry_user_author_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'Лента {self.user}: {self.recipe}'
@@ -0,0 +1,126 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter, namedtuple
+
+from django.db import transaction
+
+from foodgram.generations import bump_generation, get_generation
+from .models import RecipeIngredient
+
+Snapshot = namedtuple('Snapshot', ('generation', 'postings', 'recipes'))
+
+
+class RecipeIngredientIndex:
+    generation_name = 'recipe_ingredients'
+    typecode = 'q'
+
+    def __init__(self):
+        self._snapshot = Snapshot(None, {}, {})
+
+    def build(self, generation):
+        postings = {}
+        recipes = {}
+        rows = RecipeIngredient.objects.order_by(
+            'ingredient_id',
+            'recipe_id',
+        ).values_list('ingredient_id', 'recipe_id')
+        for ingredient_id, recipe_id in rows.iterator():
+            recipe_ids = postings.get(ingredient_id)
+            if recipe_ids is None:
+                recipe_ids = postings[ingredient_id] = array(self.typecode)
+            recipe_ids.append(recipe_id)
+            recipes.setdefault(recipe_id, set()).add(ingredient_id)
+        return Snapshot(
+            generation,
+            postings,
+            {
+                recipe_id: frozenset(ingredient_ids)
+                for recipe_id, ingredient_ids in recipes.items()
+            },
+        )
+
+    def load(self):
+        generation = get_generation(self.generation_name)
+        if self._snapshot.generation != generation:
+            self._snapshot = self.build(generation)
+        return self._snapshot
+
+    def replace_recipe(self, snapshot, generation, recipe_id, ingredient_ids):
+        old_ids = snapshot.recipes.get(recipe_id, frozenset())
+        postings = dict(snapshot.postings)
+        for ingredient_id in old_ids - ingredient_ids:
+            recipe_ids = array(self.typecode, postings[ingredient_id])
+            del recipe_ids[bisect_left(recipe_ids, recipe_id)]
+            if recipe_ids:
+                postings[ingredient_id] = recipe_ids
+            else:
+                del postings[ingredient_id]
+        for ingredient_id in ingredient_ids - old_ids:
+            recipe_ids = array(
+                self.typecode,
+                postings.get(ingredient_id, ()),
+            )
+            recipe_ids.insert(bisect_left(recipe_ids, recipe_id), recipe_id)
+            postings[ingredient_id] = recipe_ids
+        recipes = dict(snapshot.recipes)
+        if ingredient_ids:
+            recipes[recipe_id] = ingredient_ids
+        else:
+            recipes.pop(recipe_id, None)
+        return Snapshot(generation, postings, recipes)
+
+    def refresh(self, recipe_id):
+        ingredient_ids = frozenset(
+            RecipeIngredient.objects.filter(
+                recipe_id=recipe_id,
+            ).values_list('ingredient_id', flat=True)
+        )
+        snapshot = self._snapshot
+        if (
+            snapshot.generation == get_generation(self.generation_name)
+            and snapshot.recipes.get(recipe_id, frozenset()) == ingredient_ids
+        ):
+            return
+        generation = bump_generation(self.generation_name)
+        if snapshot.generation is not None and (
+            generation == snapshot.generation + 1
+        ):
+            self._snapshot = self.replace_recipe(
+                snapshot,
+                generation,
+                recipe_id,
+                ingredient_ids,
+            )
+
+    def schedule_refresh(self, recipe_id):
+        transaction.on_commit(lambda: self.refresh(recipe_id))
+
+    def search(self, ingredient_ids, max_missing=None, rank='missing'):
+        snapshot = self.load()
+        matched = Counter()
+        for ingredient_id in set(ingredient_ids):
+            matched.update(snapshot.postings.get(ingredient_id, ()))
+        found = []
+        for recipe_id, matched_count in matched.items():
+            missing_count = len(snapshot.recipes[recipe_id]) - matched_count
+            if max_missing is None or missing_count <= max_missing:
+                found.append((recipe_id, matched_count, missing_count))
+        if rank == 'coverage':
+            found.sort(key=lambda entry: (
+                -entry[1] / (entry[1] + entry[2]),
+                entry[2],
+                -entry[0],
+            ))
+        else:
+            found.sort(key=lambda entry: (entry[2], -entry[1], -entry[0]))
+        return [
+            {
+                'id': recipe_id,
+                'matched_ingredients': matched_count,
+                'missing_ingredients': missing_count,
+            }
+            for recipe_id, matched_count, missing_count in found
+        ]
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from foodgram.generations import bump_generation
+from users.models import Subscribe
+from .models import (Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingCartIngredient,
+                     Tag)
+from .recipe_index import recipe_ingredient_index
+from .user_state import get_relation, invalidate_user_ids
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_generation(sender, **kwargs):
+    transaction.on_commit(lambda: bump_generation('ingredients'))
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_generation(sender, **kwargs):
+    transaction.on_commit(lambda: bump_generation('tags'))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipes_generation(sender, **kwargs):
+    transaction.on_commit(lambda: bump_generation('recipes'))
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_users_generation(sender, update_fields=None, **kwargs):
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(lambda: bump_generation('users'))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def refresh_recipe_ingredient_index(sender, instance, **kwargs):
+    recipe_ingredient_index.schedule_refresh(instance.recipe_id)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.fan_out(instance)
+
+
+@receiver(post_save, sender=Subscribe)
+def backfill_feed(sender, instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscribe)
+def prune_feed(sender, instance, **kwargs):
+    FeedEntry.objects.prune(instance.user_id, instance.author_id)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscribe)
+def invalidate_user_state(sender, instance, **kwargs):
+    invalidate_user_ids(instance.user_id, get_relation(sender))
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_carts(sender, instance, **kwargs):
+    ShoppingCartIngredient.objects.remove_recipes(
+        ShoppingCart.objects.filter(
+            recipe=instance,
+        ).values_list('user_id', flat=True),
+        (instance.pk,),
+    )
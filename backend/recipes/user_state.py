@@ -0,0 +1,74 @@
+from array import array
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.generations import bump_generation, get_generation
+from users.models import Subscribe
+from .models import Favorite, ShoppingCart
+
+KEY_PREFIX = 'user-state'
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'subscriptions': (Subscribe, 'author_id'),
+}
+
+
+def get_relation(model):
+    for relation, (relation_model, _) in RELATIONS.items():
+        if relation_model is model:
+            return relation
+    raise LookupError(f'No user state for {model.__name__}')
+
+
+def get_cache_key(relation, user_id):
+    return f'{KEY_PREFIX}:{relation}:{user_id}'
+
+
+def get_generation_name(relation, user_id):
+    return f'{KEY_PREFIX}:{relation}:{user_id}'
+
+
+def load_ids(relation, user_id):
+    key = get_cache_key(relation, user_id)
+    generation = get_generation(
+        get_generation_name(relation, user_id),
+        settings.USER_STATE_CACHE_TIMEOUT,
+    )
+    entry = cache.get(key)
+    if entry is not None and entry[0] == generation:
+        return frozenset(entry[1])
+    model, field = RELATIONS[relation]
+    packed = array(
+        'q',
+        sorted(
+            model.objects.filter(
+                user_id=user_id,
+            ).values_list(field, flat=True)
+        ),
+    )
+    cache.set(key, (generation, packed), settings.USER_STATE_CACHE_TIMEOUT)
+    return frozenset(packed)
+
+
+def get_user_ids(request, relation):
+    user = request.user
+    if user.is_anonymous:
+        return frozenset()
+    if not hasattr(request, 'user_state'):
+        request.user_state = {}
+    if relation not in request.user_state:
+        request.user_state[relation] = load_ids(relation, user.pk)
+    return request.user_state[relation]
+
+
+def invalidate_user_ids(user_id, relation):
+    transaction.on_commit(
+        lambda: bump_generation(
+            get_generation_name(relation, user_id),
+            settings.USER_STATE_CACHE_TIMEOUT,
+        )
+    )
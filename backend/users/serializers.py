@@ -2,7 +2,10 @@ from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
 
+from api.fields import ImageVariantField
+from foodgram.metrics import SerializerMetricsMixin
 from recipes.models import Recipe
+from recipes.user_state import get_user_ids
 
 from .models import User
 
@@ -20,7 +23,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(SerializerMetricsMixin, UserSerializer):
     is_subscribed = SerializerMethodField(
         method_name='get_is_subscribed',
     )
@@ -30,7 +33,7 @@ class CustomUserSerializer(UserSerializer):
         user = request.user
         return (
             not user.is_anonymous
-            and user.subscribers.filter(author=obj).exists()
+            and obj.pk in get_user_ids(request, 'subscriptions')
         )
 
     class Meta:
@@ -45,13 +48,34 @@ class CustomUserSerializer(UserSerializer):
         )
 
 
-class RecipeSubscribeSerializer(serializers.ModelSerializer):
+class RecipesLimitSerializer(serializers.Serializer):
+    recipes_limit = serializers.IntegerField(
+        min_value=1,
+        required=False,
+    )
+
+
+def get_recipes_limit(request):
+    serializer = RecipesLimitSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data.get('recipes_limit')
+
+
+class RecipeSubscribeSerializer(
+    SerializerMetricsMixin,
+    serializers.ModelSerializer,
+):
+    image_card = ImageVariantField()
+    image_thumbnail = ImageVariantField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_card',
+            'image_thumbnail',
             'cooking_time',
         )
 
@@ -65,12 +89,13 @@ class SubscribeSerializer(CustomUserSerializer):
     )
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit')
-        if recipes_limit:
-            limit = int(recipes_limit)
-            recipes = recipes[:limit]
+        recipes = getattr(obj, 'latest_recipes', None)
+        if recipes is None:
+            request = self.context.get('request')
+            recipes = obj.recipes.all()
+            recipes_limit = get_recipes_limit(request)
+            if recipes_limit:
+                recipes = recipes[:recipes_limit]
         serializer = RecipeSubscribeSerializer(
             recipes,
             many=True,
@@ -79,7 +104,10 @@ class SubscribeSerializer(CustomUserSerializer):
         return serializer.data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is None:
+            return obj.recipes.count()
+        return recipes_count
 
     class Meta:
         model = User
@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import status
@@ -7,9 +8,11 @@ from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 
-from foodgram.pagination import CustomPagination
+from foodgram.pagination import OptionalKeysetPagination
+from recipes.models import Recipe
 from .models import Subscribe
-from .serializers import CustomUserSerializer, SubscribeSerializer
+from .serializers import (CustomUserSerializer, SubscribeSerializer,
+                          get_recipes_limit)
 
 User = get_user_model()
 
@@ -18,7 +21,13 @@ class CustomUserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    pagination_class = CustomPagination
+    pagination_class = OptionalKeysetPagination
+
+    @property
+    def keyset_ordering(self):
+        if self.action == 'subscriptions':
+            return ('id',)
+        return None
 
     @action(
         detail=True,
@@ -46,6 +55,16 @@ class CustomUserViewSet(UserViewSet):
         Subscribe.objects.create(user=user, author=author)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def attach_latest_recipes(self, authors, recipes_limit):
+        recipes = Recipe.objects.filter(author__in=authors)
+        if recipes_limit:
+            recipes = recipes.latest_by_author(recipes_limit)
+        latest_recipes = {author.pk: [] for author in authors}
+        for recipe in recipes:
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in authors:
+            author.latest_recipes = latest_recipes[author.pk]
+
     @action(
         detail=False,
         url_path='subscriptions',
@@ -54,8 +73,14 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        subscriptions = User.objects.filter(subscribe__user=user)
+        recipes_limit = get_recipes_limit(request)
+        subscriptions = User.objects.filter(
+            subscribe__user=user,
+        ).annotate(
+            recipes_count=Count('recipes'),
+        ).order_by('id')
         pages = self.paginate_queryset(subscriptions)
+        self.attach_latest_recipes(pages, recipes_limit)
         serializer = SubscribeSerializer(
             pages,
             many=True,